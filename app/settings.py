@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "budget.middleware.QueryInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -53,6 +54,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# SQL query count / time, serializer time and response size per request, as Server-Timing
+# header and log line (budget.middleware); off unless REQUEST_INSTRUMENTATION=1
+REQUEST_INSTRUMENTATION = os.environ.get("REQUEST_INSTRUMENTATION", "0") == "1"
+REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD = int(os.environ.get("REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD", 5))
+
 ROOT_URLCONF = "app.urls"
 
 TEMPLATES = [
@@ -77,6 +83,11 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# Connections are kept for POSTGRES_CONN_MAX_AGE seconds and pinged before a new request reuses them.
+# POSTGRES_POOL_SIZE > 0 switches to a pool of at most that many connections per process instead,
+# every request borrows one for its duration, see budget.backends.postgresql_pool
+POSTGRES_POOL_SIZE = int(os.environ.get("POSTGRES_POOL_SIZE", 0))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql_psycopg2",
@@ -89,9 +100,50 @@ DATABASES = {
         "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
         # 'HOST': 'db',
         "PORT": 5432,
+        "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.environ.get("POSTGRES_CONN_HEALTH_CHECKS", "1") == "1",
     }
 }
 
+if POSTGRES_POOL_SIZE:
+    DATABASES["default"].update(
+        ENGINE="budget.backends.postgresql_pool",
+        CONN_MAX_AGE=0,
+        OPTIONS={
+            "pool": {
+                "max_size": POSTGRES_POOL_SIZE,
+                "timeout": int(os.environ.get("POSTGRES_POOL_TIMEOUT", 30)),
+                "max_idle": int(os.environ.get("POSTGRES_POOL_MAX_IDLE", 300)),
+            }
+        },
+    )
+
+
+# Read replicas: POSTGRES_REPLICAS="host[:port][/name],..." adds a "replica_N" database per entry with the
+# primary's settings. GET requests of the budget and record endpoints read from a random replica, unless the
+# user wrote in the last REPLICA_STICKINESS seconds, see budget.routers. The stickiness is kept in the
+# REPLICA_CACHE_ALIAS cache, which has to be shared by all processes for the guarantee to hold.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get("POSTGRES_REPLICAS", "").split(","))):
+    address, _, name = replica.strip().partition("/")
+    host, _, port = address.partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": int(port or DATABASES["default"]["PORT"]),
+        "NAME": name or DATABASES["default"]["NAME"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["budget.routers.ReplicaRouter"]
+REPLICA_STICKINESS = int(os.environ.get("REPLICA_STICKINESS", 5))
+REPLICA_CACHE_ALIAS = os.environ.get("REPLICA_CACHE_ALIAS", "default")
+
+# RECORD_PARTITIONS=1 makes migration 0009 partition the record table by created_at month on PostgreSQL,
+# see budget.partitions. manage_partitions keeps RECORD_PARTITIONS_AHEAD months of partitions created ahead.
+RECORD_PARTITIONS = os.environ.get("RECORD_PARTITIONS", "0") == "1"
+RECORD_PARTITIONS_AHEAD = int(os.environ.get("RECORD_PARTITIONS_AHEAD", 3))
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -136,13 +188,51 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "budget.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_RENDERER_CLASSES": [
+        "budget.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "budget.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_PAGINATION_CLASS": "budget.pagination.LimitOffsetOrCursorPagination",
     "PAGE_SIZE": 20,
 }
 
+# Authenticated tokens are cached for TOKEN_CACHE_TTL seconds, in process (LRU of TOKEN_CACHE_MAX_SIZE
+# entries) or in the Django cache named by TOKEN_CACHE_ALIAS, see budget.authentication
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 60))
+TOKEN_CACHE_MAX_SIZE = int(os.environ.get("TOKEN_CACHE_MAX_SIZE", 10000))
+TOKEN_CACHE_ALIAS = os.environ.get("TOKEN_CACHE_ALIAS") or None
+
+# /budgets and /records lists are built from .values() rows instead of model serializers, see
+# budget.serializers.ValuesSerializer; VALUES_LIST_SERIALIZERS=0 goes back to the model serializers
+VALUES_LIST_SERIALIZERS = os.environ.get("VALUES_LIST_SERIALIZERS", "1") == "1"
+
+# Ids of the budgets every user owns, dropped on owner changes and budget deletes, see
+# budget.models.BudgetManager; the drop only reaches other processes through a shared cache, so they are
+# cached (for 60 seconds by default) only when ACCESSIBLE_BUDGETS_CACHE_ALIAS names one
+ACCESSIBLE_BUDGETS_CACHE_ALIAS = os.environ.get("ACCESSIBLE_BUDGETS_CACHE_ALIAS", "default")
+ACCESSIBLE_BUDGETS_CACHE_TTL = int(
+    os.environ.get("ACCESSIBLE_BUDGETS_CACHE_TTL", 60 if "ACCESSIBLE_BUDGETS_CACHE_ALIAS" in os.environ else 0)
+)
+
+# Serialized /budgets and /records list and detail responses, keyed by their ETag, see budget.caching;
+# RESPONSE_CACHE_TTL=0 keeps only the ETag / 304 handling
+RESPONSE_CACHE_ALIAS = os.environ.get("RESPONSE_CACHE_ALIAS", "default")
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 300))
+
+# /sync watermarks lag this many seconds behind the clock, longer than any write transaction runs
+SYNC_SAFETY_LAG = int(os.environ.get("SYNC_SAFETY_LAG", 30))
+
+# Days of /sync tombstones kept by prune_sync_events; an older ?since= gets 410 and a full sync
+SYNC_EVENT_RETENTION_DAYS = int(os.environ.get("SYNC_EVENT_RETENTION_DAYS", 90))
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -18,7 +18,8 @@ from django.urls import include, path
 from rest_framework import routers
 from rest_framework.authtoken.views import obtain_auth_token
 
-from budget.views import BudgetRecordViewSet, BudgetViewSet, UserCreate
+from budget.async_views import AsyncBudgetListView, AsyncBudgetRecordListView, AsyncBudgetSummariesView
+from budget.views import BudgetRecordViewSet, BudgetViewSet, SyncView, UserCreate
 
 router = routers.DefaultRouter()
 router.register(r"budgets", BudgetViewSet)
@@ -27,6 +28,10 @@ router.register(r"records", BudgetRecordViewSet)
 urlpatterns = [
     path("", include(router.urls)),
     path("admin/", admin.site.urls),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("async/budgets/", AsyncBudgetListView.as_view(), name="async-budget-list"),
+    path("async/budgets/summary/", AsyncBudgetSummariesView.as_view(), name="async-budget-summaries"),
+    path("async/records/", AsyncBudgetRecordListView.as_view(), name="async-budgetrecord-list"),
     path("account/register", UserCreate.as_view(), name="register"),
     path("api-token-auth/", obtain_auth_token, name="api_token_auth"),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
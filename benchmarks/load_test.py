@@ -0,0 +1,119 @@
+"""
+Throughput and latency of the WSGI deployment (synchronous views) against the ASGI
+deployment (async views) at increasing concurrency, using only the standard library.
+
+    docker-compose --profile load up -d --build wsgi asgi
+    docker-compose exec web python manage.py seed_db --users 100 --records-per-budget 1000 --copy
+    python benchmarks/load_test.py --wsgi http://localhost:8001 --asgi http://localhost:8002
+
+Both deployments have to run on the same hardware with the same number of workers.
+"""
+import argparse
+import http.client
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# endpoint: (synchronous path served by WSGI, async path served by ASGI)
+ENDPOINTS = {
+    "budget-list": ("/budgets/", "/async/budgets/"),
+    "record-list": ("/records/", "/async/records/"),
+    "summaries": ("/budgets/summary/", "/async/budgets/summary/"),
+}
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)] if values else 0
+
+
+class Worker(threading.local):
+    """One keep-alive connection per thread."""
+
+    def connection(self, base_url):
+        if getattr(self, "conn", None) is None:
+            url = urlparse(base_url)
+            self.conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        return self.conn
+
+    def close(self):
+        if getattr(self, "conn", None) is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def get_token(base_url, username, password):
+    url = urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    body = json.dumps({"username": username, "password": password})
+    conn.request("POST", "/api-token-auth/", body, {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    if response.status != 200:
+        raise SystemExit(f"Login to {base_url} failed with {response.status}: {response.read()[:200]}")
+    return json.loads(response.read())["token"]
+
+
+def run(base_url, path, token, concurrency, requests):
+    worker = Worker()
+    headers = {"Authorization": f"Token {token}"}
+
+    def request(_):
+        started = time.perf_counter()
+        try:
+            conn = worker.connection(base_url)
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            worker.close()
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(request, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    timings = [timing * 1000 for timing, ok in results if ok]
+    return {
+        "rps": len(timings) / elapsed,
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "errors": sum(1 for _, ok in results if not ok),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wsgi", default="http://localhost:8001", help="Base URL of the WSGI deployment")
+    parser.add_argument("--asgi", default="http://localhost:8002", help="Base URL of the ASGI deployment")
+    parser.add_argument("--username", default="load_0000000")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--endpoint", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 10, 50, 100])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint and concurrency level")
+    args = parser.parse_args()
+
+    deployments = {"wsgi": (args.wsgi, 0), "asgi": (args.asgi, 1)}
+    tokens = {name: get_token(url, args.username, args.password) for name, (url, _) in deployments.items()}
+
+    print(
+        f"{'endpoint':<14}{'concurrency':>12}{'deployment':>12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+    )
+    for endpoint in args.endpoint:
+        for concurrency in args.concurrency:
+            for name, (url, path_index) in deployments.items():
+                path = ENDPOINTS[endpoint][path_index]
+                result = run(url, path, tokens[name], concurrency, args.requests)
+                print(
+                    f"{endpoint:<14}{concurrency:>12}{name:>12}{result['rps']:>10.1f}"
+                    f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['errors']:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
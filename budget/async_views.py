@@ -0,0 +1,92 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from budget.authentication import CachedTokenAuthentication
+from budget.models import Budget
+from budget.renderers import FastJSONRenderer
+from budget.reports import abudget_summaries
+from budget.routers import read_db, read_db_for
+from budget.serializers import BudgetSummarySerializer
+from budget.views import BudgetRecordViewSet, BudgetViewSet
+
+
+class AsyncViewSetView(View):
+    """
+    Async GET of a read-only viewset action. Queryset, serializer and pagination come
+    from the viewset, so responses are the same as from the synchronous endpoint, but
+    the database is read with the async ORM and the worker is free while queries run.
+    Only token authentication is supported.
+    """
+
+    viewset = None
+    action = None
+    authentication = CachedTokenAuthentication()
+
+    async def get(self, request, *args, **kwargs):
+        drf_request = Request(request)
+        try:
+            credentials = await self.authentication.aauthenticate(request)
+            if credentials is None:
+                raise exceptions.NotAuthenticated()
+            drf_request.user, drf_request.auth = credentials
+            view = self.viewset(request=drf_request, action=self.action, format_kwarg=None, args=args, kwargs=kwargs)
+            view.read_db = read_db_for(drf_request.user)
+            # a cache miss queries the owners, which get_queryset() cannot do in the event loop
+            view.budget_ids = await sync_to_async(Budget.objects.accessible_ids)(drf_request.user)
+            token = read_db.set(view.read_db)
+            try:
+                data = await self.handle(view)
+            finally:
+                read_db.reset(token)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc, drf_request)
+        return self.render(data)
+
+    async def handle(self, view):
+        raise NotImplementedError
+
+    def handle_exception(self, exc, request):
+        response = exception_handler(exc, {"request": request, "view": self})
+        rendered = self.render(response.data, status=response.status_code)
+        for name, value in response.items():
+            rendered[name] = value
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            rendered["WWW-Authenticate"] = self.authentication.authenticate_header(request)
+        return rendered
+
+    @staticmethod
+    def render(data, status=200):
+        return HttpResponse(FastJSONRenderer().render(data), content_type="application/json", status=status)
+
+
+class AsyncListView(AsyncViewSetView):
+    action = "list"
+
+    async def handle(self, view):
+        queryset = view.filter_queryset(view.get_queryset())
+        page = await view.paginator.apaginate_queryset(queryset, view.request, view=view)
+        serializer = view.get_serializer(page, many=True)
+        return view.paginator.get_paginated_response(serializer.data).data
+
+
+class AsyncBudgetListView(AsyncListView):
+    viewset = BudgetViewSet
+
+
+class AsyncBudgetRecordListView(AsyncListView):
+    viewset = BudgetRecordViewSet
+
+
+class AsyncBudgetSummariesView(AsyncViewSetView):
+    viewset = BudgetViewSet
+    action = "summaries"
+
+    async def handle(self, view):
+        date_range = view.get_date_range()
+        budget_ids = [budget_id async for budget_id in view.get_summaries_queryset().values_list("id", flat=True)]
+        summaries = await abudget_summaries(budget_ids, **date_range)
+        return BudgetSummarySerializer(summaries, many=True).data
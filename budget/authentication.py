@@ -0,0 +1,117 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+
+class LocalTokenCache:
+    """In-process LRU of ``key -> (user, token)`` whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # callers may change the user, so they get their own copy
+        return tuple(copy.copy(item) for item in value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedTokenCache:
+    """The same interface on top of a Django cache, so every process sees an invalidation."""
+
+    prefix = "auth-token:"
+
+    def __init__(self, alias, ttl):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.cache.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.cache.set(self.prefix + key, value, self.ttl)
+
+    def delete(self, *keys):
+        self.cache.delete_many([self.prefix + key for key in keys])
+
+    def clear(self):
+        self.cache.clear()
+
+
+def _create_token_cache():
+    if settings.TOKEN_CACHE_ALIAS:
+        return SharedTokenCache(settings.TOKEN_CACHE_ALIAS, settings.TOKEN_CACHE_TTL)
+    return LocalTokenCache(settings.TOKEN_CACHE_MAX_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+token_cache = _create_token_cache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` that keeps authenticated tokens in ``token_cache`` for
+    ``TOKEN_CACHE_TTL`` seconds instead of querying ``Token`` join ``User`` on every
+    request. Token deletes and user saves drop the cached entries (see ``budget.models``);
+    with the in-process cache other processes notice only when the entry expires.
+    """
+
+    def authenticate_credentials(self, key):
+        if cached := token_cache.get(key):
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, (user, token))
+        return user, token
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views: the token cache first, then one query with the async ORM."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed(_("Invalid token header."))
+        key = auth[1].decode(errors="replace")
+
+        if cached := token_cache.get(key):
+            return cached
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related("user").aget(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        token_cache.set(key, (token.user, token))
+        return token.user, token
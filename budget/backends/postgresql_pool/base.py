@@ -0,0 +1,91 @@
+"""
+PostgreSQL backend sharing a bounded pool of connections between the threads of a
+process. Django "closes" the connection at the end of every request (``CONN_MAX_AGE``
+0), which returns it to the pool, so the number of connections per process stays at
+``OPTIONS["pool"]["max_size"]`` however many threads serve requests, and requests
+skip the connection setup. ``CONN_HEALTH_CHECKS`` pings idle connections before reuse.
+
+    "ENGINE": "budget.backends.postgresql_pool",
+    "OPTIONS": {"pool": {"max_size": 10, "timeout": 30, "max_idle": 300}},
+"""
+import threading
+
+from django.db.backends.postgresql import base, creation
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from budget.backends.postgresql_pool.pool import ConnectionPool, PoolTimeout
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    key = (alias, settings_dict["NAME"])
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**settings_dict["OPTIONS"].get("pool", {"max_size": 10}))
+        return _pools[key]
+
+
+def close_pool(alias, name):
+    with _pools_lock:
+        pool = _pools.pop((alias, name), None)
+    if pool is not None:
+        pool.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # idle pooled connections would keep the test database open
+        close_pool(self.connection.alias, test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        check = self._ping if self.settings_dict["CONN_HEALTH_CHECKS"] else None
+        try:
+            connection, reused = self.pool.acquire(lambda: self._connect(conn_params), check=check)
+        except PoolTimeout as error:
+            raise base.Database.OperationalError(str(error))
+        if reused:
+            self.isolation_level = connection.isolation_level
+        return connection
+
+    def _connect(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # a connection closed inside atomic() stays referenced by this wrapper, so it is not shared
+        discard = self.in_atomic_block
+        if not discard and not self.connection.closed:
+            try:
+                if self.connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    self.connection.rollback()
+            except base.Database.Error:
+                discard = True
+        self.pool.release(self.connection, discard=discard)
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
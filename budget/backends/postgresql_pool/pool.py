@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of at most ``max_size`` DB-API connections. ``acquire`` waits up
+    to ``timeout`` seconds for a free slot, reuses the most recently released idle
+    connection and opens a new one with ``connect`` when none is idle. Connections idle
+    for longer than ``max_idle`` seconds are closed instead of reused.
+    """
+
+    def __init__(self, max_size, timeout=30, max_idle=300):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.opened = 0
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+
+    def acquire(self, connect, check=None):
+        """Return ``(connection, reused)``; ``check(connection)`` vets idle connections before reuse."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection free within {self.timeout}s (pool size {self.max_size})")
+        try:
+            while connection := self._pop_idle():
+                if check is None or check(connection):
+                    return connection, True
+                self._close(connection)
+            connection = connect()
+            with self._lock:
+                self.opened += 1
+            return connection, False
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            if discard or connection.closed:
+                self._close(connection)
+            else:
+                with self._lock:
+                    self._idle.append((time.monotonic(), connection))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close the idle connections; connections in use are closed when released."""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for _, connection in idle:
+            self._close(connection)
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def _pop_idle(self):
+        expired = []
+        with self._lock:
+            deadline = time.monotonic() - self.max_idle
+            while self._idle and self._idle[0][0] < deadline:
+                expired.append(self._idle.popleft()[1])
+            connection = self._idle.pop()[1] if self._idle else None
+        for stale in expired:
+            self._close(stale)
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,149 @@
+"""
+Latency, SQL query count and rows fetched of the main API endpoints.
+
+``run_benchmarks`` sends real requests through the test client as one user and
+``compare`` checks the results against stored baselines. Query counts are
+compared exactly, so a serializer that starts querying per row (N+1) shows up
+even on a small data set; rows and latency are compared with a tolerance. Rows
+are only known where the driver reports them and latency on SQLite follows the
+machine's disk more than the code, so it is only reported there.
+"""
+import json
+import math
+import time
+
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from budget.models import Budget, BudgetCategory
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+# newest seeded record, the same data on every run
+SEED_UNTIL = "2023-01-01"
+ADVISORY_LATENCY_VENDORS = {"sqlite"}
+
+
+class QueryStats:
+    """
+    ``execute_wrapper`` counting queries and the rows they return. Rows are taken
+    from the driver's ``rowcount``; SQLite does not report it for SELECTs and
+    ``rows`` stays ``None``.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = None
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        rowcount = context["cursor"].rowcount
+        if sql.lstrip().upper().startswith("SELECT") and rowcount >= 0:
+            self.rows = (self.rows or 0) + rowcount
+        return result
+
+
+def seed_options(size, prefix):
+    """``seed_db`` options generating ``size`` records over 10 users with 5 budgets each."""
+    records_per_budget = SIZES[size] // 50
+    return (
+        *("--users", 10, "--budgets-per-user", 5, "--records-per-budget", records_per_budget, "--categories", 20),
+        *("--seed", 0, "--until", SEED_UNTIL, "--prefix", prefix, "--copy"),
+    )
+
+
+def endpoints(user):
+    budget = Budget.objects.filter(owners=user).order_by("id").first()
+    category = BudgetCategory.objects.order_by("id").first()
+    records = reverse("budgetrecord-list")
+    nested_records = [{"amount": "-1.00", "category": {"name": category.name}}] * 10
+    return {
+        "budget-list": ("get", reverse("budget-list"), None),
+        "budget-retrieve": ("get", reverse("budget-detail", args=(budget.id,)), None),
+        "record-list": ("get", records, None),
+        "record-list-by-budget": ("get", f"{records}?budget={budget.id}", None),
+        "record-list-by-category": ("get", f"{records}?category={category.id}", None),
+        "record-create": ("post", records, {"amount": "-12.34", "budget": budget.id}),
+        "budget-create-nested": (
+            "post",
+            reverse("budget-list"),
+            {"name": "benchmark", "owners": [user.id], "records": nested_records},
+        ),
+    }
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def _request(client, method, url, data):
+    if method == "get":
+        return client.get(url)
+    # writes are rolled back so every iteration runs against the same data
+    with transaction.atomic():
+        response = client.post(url, data=json.dumps(data), content_type="application/json")
+        transaction.set_rollback(True)
+    return response
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)
+def run_benchmarks(user, iterations=20, warmup=2):
+    """Benchmarks of every endpoint; GETs skip the response cache so they measure the full request."""
+    token, _ = Token.objects.get_or_create(user=user)
+    client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+    results = {}
+    for name, (method, url, data) in endpoints(user).items():
+        for _ in range(warmup):
+            _request(client, method, url, data)
+
+        timings, stats = [], QueryStats()
+        for _ in range(iterations):
+            request_stats = QueryStats()
+            with connection.execute_wrapper(request_stats):
+                started = time.perf_counter()
+                response = _request(client, method, url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: {method.upper()} {url} returned {response.status_code}")
+            stats.queries = max(stats.queries, request_stats.queries)
+            if request_stats.rows is not None:
+                stats.rows = max(stats.rows or 0, request_stats.rows)
+
+        results[name] = {
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "queries": stats.queries,
+            "rows": stats.rows,
+        }
+    return results
+
+
+def compare(results, baselines, latency_tolerance=0.5, rows_tolerance=0.1):
+    """
+    Regressions of ``results`` against ``baselines``; metrics missing from a baseline
+    or not measured are not checked, and neither is latency with ``latency_tolerance=None``.
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name, {})
+        if "queries" in baseline and result["queries"] > baseline["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries, baseline {baseline['queries']} (N+1?)")
+        rows_measured = None not in (baseline.get("rows"), result["rows"])
+        if rows_measured and result["rows"] > baseline["rows"] * (1 + rows_tolerance):
+            regressions.append(f"{name}: {result['rows']} rows fetched, baseline {baseline['rows']}")
+    if latency_tolerance is not None:
+        regressions += slower(results, baselines, latency_tolerance)
+    return regressions
+
+
+def slower(results, baselines, latency_tolerance=0.5):
+    """Endpoints of ``results`` whose p95 latency grew more than ``latency_tolerance`` over ``baselines``."""
+    return [
+        f"{name}: p95 {result['p95_ms']}ms, baseline {baselines[name]['p95_ms']}ms"
+        for name, result in results.items()
+        if "p95_ms" in baselines.get(name, {})
+        and result["p95_ms"] > baselines[name]["p95_ms"] * (1 + latency_tolerance)
+    ]
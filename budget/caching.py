@@ -0,0 +1,73 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from budget.models import Budget
+
+
+def data_version(user):
+    """
+    One aggregate that changes whenever anything the user can read changes: budgets are
+    touched by their own saves and by owner changes, records by the totals they update.
+    Deleted budgets and budgets the user lost access to lower the count.
+    """
+    return Budget.objects.filter(id__in=Budget.objects.accessible_ids(user)).aggregate(
+        budgets=Count("id", distinct=True),
+        budgets_updated=Max("updated_at"),
+        records_updated=Max("totals__updated_at"),
+    )
+
+
+class ConditionalGetMixin:
+    """
+    ETag and ``If-None-Match`` support for ``list`` and ``retrieve``. The ETag hashes the
+    user's ``data_version`` with the request path, so an unchanged poll costs the version
+    query and gets a 304, and a changed one is served from the response cache when the
+    same page was serialized before under the same version.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_etag(self, request):
+        version = data_version(request.user)
+        key = "|".join(
+            (str(request.user.pk), request.get_full_path(), request.accepted_media_type, *map(str, version.values()))
+        )
+        return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if self._matches(etag, request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif (data := self._cached_data(etag)) is not None:
+            response = Response(data)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            if settings.RESPONSE_CACHE_TTL:
+                caches[settings.RESPONSE_CACHE_ALIAS].set(
+                    f"response:{etag}", response.data, settings.RESPONSE_CACHE_TTL
+                )
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+    @staticmethod
+    def _cached_data(etag):
+        if not settings.RESPONSE_CACHE_TTL:
+            return None
+        return caches[settings.RESPONSE_CACHE_ALIAS].get(f"response:{etag}")
+
+    @staticmethod
+    def _matches(etag, if_none_match):
+        return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
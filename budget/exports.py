@@ -0,0 +1,66 @@
+import csv
+import json
+from datetime import datetime
+from decimal import Decimal
+
+EXPORT_FIELDS = {
+    "id": "id",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "amount": "amount",
+    "budget": "budget_id",
+    "category": "category_id",
+    "category_name": "category__name",
+}
+EXPORT_CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class Echo:
+    """File-like object that hands back what the csv writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def _format(value):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def export_rows(records, chunk_size=2000):
+    """
+    Plain value rows of ``records`` read through a server-side cursor, so memory
+    stays flat however many records are exported.
+    """
+    rows = records.prefetch_related(None).values_list(*EXPORT_FIELDS.values())
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield [_format(value) for value in row]
+
+
+def _batched(lines, size=500):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    yield from _batched(writer.writerow(row) for row in rows)
+
+
+def stream_ndjson(rows):
+    header = list(EXPORT_FIELDS)
+    yield from _batched(json.dumps(dict(zip(header, row))) + "\n" for row in rows)
+
+
+EXPORT_STREAMS = {"csv": stream_csv, "ndjson": stream_ndjson}
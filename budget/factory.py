@@ -40,6 +40,7 @@ class BudgetFactory(factory.django.DjangoModelFactory):
 class CategoryFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = BudgetCategory
+        django_get_or_create = ("name",)
 
     name = random.choice(["Food", "Car", "Hobby", "Other"])
 
@@ -48,11 +49,11 @@ class IncomeBudgetFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = BudgetRecord
 
-    amount = factory.LazyAttribute(lambda o: faker.pyint(min_value=2, max_value=10000, step=1))
+    amount = factory.LazyAttribute(lambda o: faker.pyint(min_value=2, max_value=9999, step=1))
 
 
 class ExpenseBudgetFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = BudgetRecord
 
-    amount = factory.LazyAttribute(lambda o: faker.pyint(min_value=-10000, max_value=-2, step=1))
+    amount = factory.LazyAttribute(lambda o: faker.pyint(min_value=-9999, max_value=-2, step=1))
@@ -0,0 +1,86 @@
+import json
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from budget.benchmarks import ADVISORY_LATENCY_VENDORS, SIZES, compare, run_benchmarks, seed_options, slower
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a test database at the given sizes and benchmark the main API endpoints. "
+        "Fails when query count, rows fetched or p95 latency regress against the stored baselines; "
+        "latency on SQLite only warns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", nargs="+", choices=SIZES, default=["1k"])
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--baselines", type=Path, default=settings.BASE_DIR / "benchmarks" / "baselines.json")
+        parser.add_argument("--update-baselines", action="store_true")
+        parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Allowed p95 increase, 0.5 is 50%%")
+        parser.add_argument("--rows-tolerance", type=float, default=0.1)
+        parser.add_argument("--keepdb", action="store_true", help="Keep the seeded test database for the next run")
+
+    def handle(self, *args, **options):
+        baselines = {}
+        if options["baselines"].exists():
+            with options["baselines"].open() as file:
+                baselines = json.load(file)
+        stored = baselines.setdefault(connection.vendor, {})
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            regressions = []
+            advisory = connection.vendor in ADVISORY_LATENCY_VENDORS
+            for size in options["size"]:
+                results = run_benchmarks(self.seed(size), options["iterations"])
+                baseline = stored.get(size, {})
+                self.report(size, results, baseline)
+                latency_tolerance = None if advisory else options["latency_tolerance"]
+                regressions += [
+                    f"[{size}] {regression}"
+                    for regression in compare(results, baseline, latency_tolerance, options["rows_tolerance"])
+                ]
+                if advisory:
+                    for warning in slower(results, baseline, options["latency_tolerance"]):
+                        logger.warning("[%s] %s, not failing on %s", size, warning, connection.vendor)
+                stored[size] = results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        if options["update_baselines"]:
+            with options["baselines"].open("w") as file:
+                json.dump(baselines, file, indent=2, sort_keys=True)
+                file.write("\n")
+            logger.info("Baselines updated!")
+        elif regressions:
+            raise CommandError("Regressions:\n" + "\n".join(regressions))
+
+    def seed(self, size):
+        prefix = f"bench{size}"
+        username = f"{prefix}_{0:07d}"
+        if not User.objects.filter(username=username).exists():
+            logger.info("Seeding %s records...", size)
+            call_command("seed_db", *seed_options(size, prefix))
+        return User.objects.get(username=username)
+
+    def report(self, size, results, baselines):
+        self.stdout.write(f"\n{size} records ({connection.vendor})")
+        self.stdout.write(f"{'endpoint':<26}{'p50 ms':>10}{'p95 ms':>10}{'queries':>10}{'rows':>10}  baseline")
+        for name, result in results.items():
+            baseline = baselines.get(name, {})
+            rows = "-" if result["rows"] is None else result["rows"]
+            self.stdout.write(
+                f"{name:<26}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['queries']:>10}{rows:>10}"
+                f"  {baseline.get('p95_ms', '-')}ms p95, {baseline.get('queries', '-')} queries"
+            )
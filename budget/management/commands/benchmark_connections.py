@@ -0,0 +1,111 @@
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import BaseCommand, call_command
+from django.db import connection, connections
+from django.test import RequestFactory, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from budget.benchmarks import percentile
+
+PREFIX = "benchconn"
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the budget list through the full WSGI request cycle with a new connection per request, "
+        "with persistent connections and with the connection pool, and compare the latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Requests per mode")
+        parser.add_argument("--concurrency", type=int, default=1, help="Threads sending requests")
+        parser.add_argument("--pool-size", type=int, default=None, help="Pool size, defaults to --concurrency")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the seeded test database for the next run")
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        original = {key: settings_dict.get(key) for key in ("ENGINE", "CONN_MAX_AGE", "OPTIONS")}
+        pool = {"max_size": options["pool_size"] or options["concurrency"], "timeout": 30}
+        modes = {
+            "per-request": {"CONN_MAX_AGE": 0},
+            "persistent": {"CONN_MAX_AGE": None},
+        }
+        if connection.vendor == "postgresql":
+            from budget.backends.postgresql_pool.base import close_pool
+
+            modes["pooled"] = {
+                "ENGINE": "budget.backends.postgresql_pool",
+                "CONN_MAX_AGE": 0,
+                "OPTIONS": {"pool": pool},
+            }
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            token = self.seed()
+            self.stdout.write(f"{options['requests']} requests per mode, {options['concurrency']} threads")
+            self.stdout.write(f"{'mode':<14}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'req/s':>10}{'errors':>8}")
+            for mode, overrides in modes.items():
+                settings_dict.update({**original, **overrides})
+                timings, errors, elapsed = self.run(token, options["requests"], options["concurrency"])
+                if mode == "pooled":
+                    close_pool(connection.alias, settings_dict["NAME"])
+                self.stdout.write(
+                    f"{mode:<14}{percentile(timings, 50):>10.2f}{percentile(timings, 95):>10.2f}"
+                    f"{sum(timings) / len(timings):>10.2f}{len(timings) / elapsed:>10.1f}{errors:>8}"
+                )
+            if "pooled" not in modes:
+                self.stdout.write("pooled: needs PostgreSQL")
+        finally:
+            settings_dict.update(original)
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+    def seed(self):
+        username = f"{PREFIX}_{0:07d}"
+        if not Token.objects.filter(user__username=username).exists():
+            call_command("seed_db", "--users", 1, "--records-per-budget", 100, "--seed", 0, "--prefix", PREFIX)
+        return Token.objects.get(user__username=username).key
+
+    @staticmethod
+    @override_settings(RESPONSE_CACHE_TTL=0)
+    def run(token, requests, concurrency):
+        """
+        Every thread gets a new connection wrapper built from the current settings, and
+        the handler opens and closes connections as it does for real requests.
+        """
+        handler = WSGIHandler()
+        environ = RequestFactory().get(reverse("budget-list"), HTTP_AUTHORIZATION=f"Token {token}").environ
+        remaining = iter(range(requests))
+        lock = threading.Lock()
+        timings = []
+        errors = 0
+
+        def worker():
+            nonlocal errors
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    started = time.perf_counter()
+                    response = handler(dict(environ), lambda status, headers: None)
+                    response.close()
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        timings.append(elapsed)
+                        errors += response.status_code != 200
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, errors, time.perf_counter() - started
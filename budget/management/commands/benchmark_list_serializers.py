@@ -0,0 +1,73 @@
+import time
+
+from django.core.management import BaseCommand, call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from budget.benchmarks import percentile
+
+PREFIX = "benchvalues"
+
+
+class Command(BaseCommand):
+    help = (
+        "Request large /records and /budgets pages with the model serializers and with the values() "
+        "serializers (VALUES_LIST_SERIALIZERS), compare rows per second and check that the responses are identical."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000, help="Records per /records page")
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--keepdb", action="store_true", help="Keep the seeded test database for the next run")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            with override_settings(RESPONSE_CACHE_TTL=0):
+                self.compare(self.seed(options["rows"]), options["rows"], options["iterations"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+    def seed(self, rows):
+        username = f"{PREFIX}_{0:07d}"
+        if not Token.objects.filter(user__username=username).exists():
+            # 10 records per budget, so the budget page has a tenth of the rows
+            call_command(
+                *("seed_db", "--users", 1, "--budgets-per-user", rows // 10, "--records-per-budget", 10),
+                *("--seed", 0, "--prefix", PREFIX),
+            )
+        return Client(HTTP_AUTHORIZATION=f"Token {Token.objects.get(user__username=username).key}")
+
+    def compare(self, client, rows, iterations):
+        urls = {
+            "records": f"{reverse('budgetrecord-list')}?limit={rows}",
+            "budgets": f"{reverse('budget-list')}?limit={rows // 10}",
+        }
+        self.stdout.write(f"{'page':<10}{'rows':>8}{'serializers':>14}{'p50 ms':>10}{'rows/s':>10}  identical")
+        for name, url in urls.items():
+            responses = {}
+            for label, enabled in (("model", False), ("values", True)):
+                with override_settings(VALUES_LIST_SERIALIZERS=enabled):
+                    timings, responses[label] = self.timeit(client, url, iterations)
+                count = len(responses[label].data["results"])
+                p50 = percentile(timings, 50)
+                identical = responses[label].content == responses["model"].content
+                self.stdout.write(
+                    f"{name:<10}{count:>8}{label:>14}{p50:>10.1f}{count / p50 * 1000:>10.0f}"
+                    f"  {'yes' if identical else 'NO'}"
+                )
+
+    @staticmethod
+    def timeit(client, url, iterations):
+        client.get(url)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings, response
@@ -0,0 +1,82 @@
+import io
+import time
+
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from budget.renderers import FastJSONParser, FastJSONRenderer, orjson
+
+PREFIX = "benchjson"
+
+
+class Command(BaseCommand):
+    help = (
+        "Render real /records and /budgets payloads with DRF's JSONRenderer and with FastJSONRenderer, "
+        "parse them back with both parsers and compare the timings and the output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--keepdb", action="store_true", help="Keep the seeded test database for the next run")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed, FastJSONRenderer falls back to JSONRenderer")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            payloads = self.payloads()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{'payload':<24}{'KB':>8}{'render ms':>11}{'fast ms':>9}{'speedup':>9}"
+            f"{'parse ms':>10}{'fast ms':>9}{'speedup':>9}  identical"
+        )
+        for name, data in payloads.items():
+            rendered = JSONRenderer().render(data)
+            render = self.timeit(JSONRenderer().render, data, options["iterations"])
+            fast_render = self.timeit(FastJSONRenderer().render, data, options["iterations"])
+            parse = self.timeit(lambda body: JSONParser().parse(io.BytesIO(body)), rendered, options["iterations"])
+            fast_parse = self.timeit(
+                lambda body: FastJSONParser().parse(io.BytesIO(body)), rendered, options["iterations"]
+            )
+            identical = FastJSONRenderer().render(data) == rendered
+            self.stdout.write(
+                f"{name:<24}{len(rendered) / 1024:>8.1f}{render:>11.3f}{fast_render:>9.3f}{render / fast_render:>8.1f}x"
+                f"{parse:>10.3f}{fast_parse:>9.3f}{parse / fast_parse:>8.1f}x  {'yes' if identical else 'NO'}"
+            )
+
+    @override_settings(RESPONSE_CACHE_TTL=0)
+    def payloads(self):
+        username = f"{PREFIX}_{0:07d}"
+        if not Token.objects.filter(user__username=username).exists():
+            call_command(
+                *("seed_db", "--users", 1, "--budgets-per-user", 20, "--records-per-budget", 100),
+                *("--seed", 0, "--prefix", PREFIX),
+            )
+        client = Client(HTTP_AUTHORIZATION=f"Token {Token.objects.get(user__username=username).key}")
+        records, budgets = reverse("budgetrecord-list"), reverse("budget-list")
+        urls = {
+            "records limit=20": f"{records}?limit=20",
+            "records limit=100": f"{records}?limit=100",
+            "budgets": f"{budgets}?limit=20",
+            "budgets expand=records": f"{budgets}?limit=20&expand=records",
+        }
+        return {name: client.get(url).data for name, url in urls.items()}
+
+    @staticmethod
+    def timeit(function, argument, iterations):
+        """Mean milliseconds per call."""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function(argument)
+        return (time.perf_counter() - started) * 1000 / iterations
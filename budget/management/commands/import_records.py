@@ -0,0 +1,184 @@
+import csv
+import logging
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from budget.models import Budget, BudgetCategory, BudgetRecord, BudgetTotal
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = {
+    "date": ("date", "created_at"),
+    "amount": ("amount",),
+    "category": ("category", "category_name"),
+}
+OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.S | re.I)
+OFX_TAG = re.compile(r"<(DTPOSTED|TRNAMT|NAME)>([^<\r\n]*)", re.I)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV (date, amount, category) or OFX-like file of transactions into a budget. "
+        "Rows are inserted in bulk, one transaction per batch; after a failed batch rerun with the "
+        "same --checkpoint file (or --start-row) to continue where the last committed batch ended."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument("--budget", type=int, required=True)
+        parser.add_argument("--format", choices=("csv", "ofx"), default=None, help="Defaults to the file extension")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--start-row", type=int, default=0, help="Skip rows up to and including this one")
+        parser.add_argument("--checkpoint", type=Path, help="File storing the last committed row")
+
+    def handle(self, *args, **options):
+        try:
+            self.budget = Budget.objects.get(pk=options["budget"])
+        except Budget.DoesNotExist:
+            raise CommandError(f"Budget {options['budget']} does not exist")
+        self.categories = {}
+        self.checkpoint = options["checkpoint"]
+
+        start_row = max(options["start_row"], self.read_checkpoint())
+        path = options["path"]
+        file_format = options["format"] or ("ofx" if path.suffix.lower() in (".ofx", ".qfx") else "csv")
+        reader = self.read_ofx if file_format == "ofx" else self.read_csv
+
+        rows = ((number, row) for number, row in reader(path) if number > start_row)
+        imported, started = 0, time.monotonic()
+        for batch in self.batched(self.parse(rows), options["batch_size"]):
+            self.insert(batch)
+            imported += len(batch)
+            logger.info(
+                "Imported %s rows up to row %s (%.0f rows/s)",
+                imported,
+                batch[-1][0],
+                imported / max(time.monotonic() - started, 1e-9),
+            )
+
+        logger.info("Records successfully imported!")
+
+    def read_csv(self, path):
+        with path.open(newline="", encoding="utf-8-sig") as file:
+            reader = csv.DictReader(file)
+            columns = self.csv_columns(reader.fieldnames or [])
+            for number, row in enumerate(reader, start=1):
+                yield number, {field: row[column] if column else None for field, column in columns.items()}
+
+    @staticmethod
+    def csv_columns(header):
+        columns = {}
+        for field, names in CSV_COLUMNS.items():
+            columns[field] = next((name for name in names if name in header), None)
+        if not columns["date"] or not columns["amount"]:
+            raise CommandError(f"CSV header needs a date and an amount column, got: {', '.join(header)}")
+        return columns
+
+    def read_ofx(self, path):
+        max_length = BudgetCategory._meta.get_field("name").max_length
+        buffer, number = "", 0
+        with path.open(encoding="utf-8", errors="replace") as file:
+            for line in file:
+                buffer += line
+                if "</STMTTRN>" not in line.upper():
+                    continue
+                for transaction_block in OFX_TRANSACTION.findall(buffer):
+                    tags = {tag.upper(): value.strip() for tag, value in OFX_TAG.findall(transaction_block)}
+                    number += 1
+                    yield number, {
+                        "date": self.ofx_date(tags.get("DTPOSTED", "")),
+                        "amount": tags.get("TRNAMT"),
+                        "category": (tags.get("NAME") or "")[:max_length],
+                    }
+                buffer = buffer[buffer.upper().rindex("</STMTTRN>") + len("</STMTTRN>") :]
+
+    @staticmethod
+    def ofx_date(value):
+        digits = re.sub(r"\D", "", value.split("[")[0])[:14]
+        try:
+            return datetime.strptime(digits.ljust(14, "0"), "%Y%m%d%H%M%S").isoformat()
+        except ValueError:
+            return value
+
+    def parse(self, rows):
+        amount_field = BudgetRecord._meta.get_field("amount")
+        name_field = BudgetCategory._meta.get_field("name")
+        for number, row in rows:
+            try:
+                created_at = self.parse_datetime(row["date"])
+                amount = amount_field.clean(row["amount"], None)
+                category = (row.get("category") or "").strip() or None
+                if category:
+                    name_field.clean(category, None)
+            except ValidationError as exc:
+                raise CommandError(f"Row {number}: {'; '.join(exc.messages)}")
+            yield number, created_at, amount, category
+
+    @staticmethod
+    def parse_datetime(value):
+        value = (value or "").strip()
+        try:
+            parsed = parse_datetime(value)
+            if parsed is None and (day := parse_date(value)):
+                parsed = datetime.combine(day, datetime.min.time())
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError(f'"{value}" is not a valid date.')
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    @staticmethod
+    def batched(rows, size):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def insert(self, batch):
+        try:
+            with transaction.atomic():
+                self.resolve_categories(name for _, _, _, name in batch if name)
+                records = [
+                    BudgetRecord(
+                        budget=self.budget,
+                        category=self.categories[name] if name else None,
+                        created_at=created_at,
+                        amount=amount,
+                    )
+                    for _, created_at, amount, name in batch
+                ]
+                BudgetRecord.objects.bulk_create(records)
+                BudgetTotal.objects.add_records(records)
+        except Exception as exc:
+            # categories created by the rolled back batch are gone again
+            self.categories = {}
+            raise CommandError(
+                f"Batch of rows {batch[0][0]}-{batch[-1][0]} failed: {exc}. "
+                f"Rows up to {batch[0][0] - 1} are imported, resume with --start-row {batch[0][0] - 1}."
+            )
+        self.write_checkpoint(batch[-1][0])
+
+    def resolve_categories(self, names):
+        if missing := set(names) - self.categories.keys():
+            self.categories.update(BudgetCategory.objects.get_or_create_by_names(missing))
+
+    def read_checkpoint(self):
+        if self.checkpoint and self.checkpoint.exists():
+            return int(self.checkpoint.read_text().strip() or 0)
+        return 0
+
+    def write_checkpoint(self, row_number):
+        if self.checkpoint:
+            self.checkpoint.write_text(str(row_number))
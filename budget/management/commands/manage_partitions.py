@@ -0,0 +1,49 @@
+import logging
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from budget import partitions
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the record table's month partitions ahead of time and detach the old ones "
+        "(PostgreSQL with RECORD_PARTITIONS only)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=settings.RECORD_PARTITIONS_AHEAD,
+            help="Months after the current one to have partitions for",
+        )
+        parser.add_argument(
+            "--retain-months",
+            type=int,
+            help="Detach the partitions of months older than this many months before the current one",
+        )
+        parser.add_argument(
+            "--convert", action="store_true", help="Partition the record table first if it is not partitioned yet"
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported(connection):
+            raise CommandError("Record partitions need PostgreSQL")
+        if not partitions.is_partitioned(connection):
+            if not options["convert"]:
+                raise CommandError("The record table is not partitioned, run with --convert to partition it")
+            partitions.partition_table(connection, ahead=options["ahead"])
+            logger.info("Record table partitioned!")
+
+        month = partitions.current_month()
+        for name in partitions.create_partitions(connection, partitions.add_months(month, options["ahead"])):
+            logger.info("Created partition %s", name)
+        if options["retain_months"] is not None:
+            before = partitions.add_months(month, -options["retain_months"])
+            for name in partitions.detach_partitions(connection, before):
+                logger.info("Detached partition %s", name)
@@ -0,0 +1,16 @@
+import logging
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from budget.models import SyncEvent
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Delete the /sync tombstones older than SYNC_EVENT_RETENTION_DAYS"
+
+    def handle(self, *args, **options):
+        deleted = SyncEvent.objects.prune()
+        logger.info("Pruned %s sync events older than %s days!", deleted, settings.SYNC_EVENT_RETENTION_DAYS)
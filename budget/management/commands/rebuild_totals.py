@@ -0,0 +1,31 @@
+import logging
+
+from django.core.management import BaseCommand, CommandError
+
+from budget.models import BudgetTotal
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the budget running totals from the records and verify them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget", type=int, action="append", dest="budgets", help="Only this budget (repeatable)")
+        parser.add_argument(
+            "--verify-only", action="store_true", help="Only compare the stored totals with the records"
+        )
+
+    def handle(self, *args, **options):
+        budget_ids = options["budgets"]
+        if not options["verify_only"]:
+            BudgetTotal.objects.rebuild(budget_ids)
+            logger.info("Totals rebuilt!")
+
+        mismatches = BudgetTotal.objects.verify(budget_ids)
+        for budget_id, category_id, month in mismatches:
+            logger.error("Totals mismatch: budget %s, category %s, month %s", budget_id, category_id, month)
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} totals do not match the records")
+
+        logger.info("Totals verified!")
@@ -1,9 +1,22 @@
+import csv
+import io
 import logging
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
 
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from rest_framework.authtoken.models import Token
 
 from budget.factory import BudgetFactory, CategoryFactory, ExpenseBudgetFactory, IncomeBudgetFactory
+from budget.models import Budget, BudgetCategory, BudgetRecord, BudgetTotal
 
 logger = logging.getLogger(__name__)
 
@@ -11,9 +24,30 @@ logger = logging.getLogger(__name__)
 class Command(
     BaseCommand,
 ):
-    help = "Create fixtures"
+    help = "Create fixtures, or with --users a large deterministic data set for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, help="Generate this many users instead of the fixtures")
+        parser.add_argument("--budgets-per-user", type=int, default=3)
+        parser.add_argument("--shared-ratio", type=float, default=0.2, help="Share of budgets with a second owner")
+        parser.add_argument("--records-per-budget", type=int, default=100)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--days", type=int, default=730, help="Spread records over this many days")
+        parser.add_argument(
+            "--until",
+            type=datetime.fromisoformat,
+            help="Newest record date, defaults to today; pass it for the same data on another day with the same seed",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="load", help="Username prefix of generated users")
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--copy", action="store_true", help="Write records with PostgreSQL COPY")
 
     def handle(self, *args, **options):
+        if options["users"]:
+            self.generate(options)
+            return
+
         self.create_users()
         self.create_categories()
         self.create_budgets()
@@ -57,3 +91,98 @@ class Command(
         IncomeBudgetFactory.create_batch(2, budget=self.vacation_budget, category=self.work_category)
 
         logger.info("Budgets created!")
+
+    def generate(self, options):
+        self.random = random.Random(options["seed"])
+        self.faker = Faker()
+        self.faker.seed_instance(options["seed"])
+        self.batch_size = options["batch_size"]
+        until = options["until"] or timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.until = timezone.make_aware(until) if timezone.is_naive(until) else until
+        logger.info("Generating with --seed %s --until %s", options["seed"], self.until.isoformat())
+        started = time.monotonic()
+
+        with transaction.atomic():
+            users = self.generate_users(options["users"], options["prefix"])
+            categories = self.generate_categories(options["categories"])
+            budgets = self.generate_budgets(users, options["budgets_per_user"], options["shared_ratio"])
+        logger.info("%s users, %s budgets and %s categories generated!", len(users), len(budgets), len(categories))
+
+        records = self.generate_records(budgets, categories, options["records_per_budget"], options["days"])
+        write = self.copy_records if options["copy"] and connection.vendor == "postgresql" else self.insert_records
+        count = 0
+        while batch := list(islice(records, self.batch_size)):
+            with transaction.atomic():
+                write(batch)
+            count += len(batch)
+            logger.info("%s records (%.0f records/s)", count, count / max(time.monotonic() - started, 1e-9))
+
+        for index in range(0, len(budgets), self.batch_size):
+            BudgetTotal.objects.rebuild(budgets[index : index + self.batch_size])
+        logger.info("Data set generated in %.1fs!", time.monotonic() - started)
+
+    def generate_users(self, count, prefix):
+        password = make_password("password")
+        users = User.objects.bulk_create(
+            (User(username=f"{prefix}_{index:07d}", password=password) for index in range(count)),
+            batch_size=self.batch_size,
+        )
+        # bulk_create skips the post_save receiver that creates tokens
+        Token.objects.bulk_create(
+            (Token(user=user, key=Token.generate_key()) for user in users), batch_size=self.batch_size
+        )
+        return [user.id for user in users]
+
+    def generate_categories(self, count):
+        # sorted, so records get the same categories for the same seed
+        names = sorted(f"{self.faker.word()} {index}" for index in range(count))
+        categories = BudgetCategory.objects.get_or_create_by_names(names)
+        return [categories[name].id for name in names]
+
+    def generate_budgets(self, users, budgets_per_user, shared_ratio):
+        budgets = Budget.objects.bulk_create(
+            (Budget(name=self.faker.word()[:30]) for _ in range(len(users) * budgets_per_user)),
+            batch_size=self.batch_size,
+        )
+        owners = []
+        for index, budget in enumerate(budgets):
+            owner_index = index // budgets_per_user
+            owners.append(Budget.owners.through(budget_id=budget.id, user_id=users[owner_index]))
+            if len(users) > 1 and self.random.random() < shared_ratio:
+                # any other user: a random offset from the owner that never wraps around to them
+                other_index = (owner_index + 1 + self.random.randrange(len(users) - 1)) % len(users)
+                owners.append(Budget.owners.through(budget_id=budget.id, user_id=users[other_index]))
+        Budget.owners.through.objects.bulk_create(owners, batch_size=self.batch_size)
+        return [budget.id for budget in budgets]
+
+    def generate_records(self, budgets, categories, records_per_budget, days):
+        seconds = days * 24 * 3600
+        for budget in budgets:
+            for _ in range(records_per_budget):
+                created_at = self.until - timedelta(seconds=self.random.randrange(seconds))
+                if self.random.random() < 0.2:
+                    amount = Decimal(self.random.randrange(100, 999999)).scaleb(-2)
+                else:
+                    amount = -Decimal(self.random.randrange(100, 50000)).scaleb(-2)
+                category = self.random.choice(categories) if categories else None
+                yield budget, category, created_at, amount
+
+    def insert_records(self, batch):
+        BudgetRecord.objects.bulk_create(
+            BudgetRecord(budget_id=budget, category_id=category, created_at=created_at, amount=amount)
+            for budget, category, created_at, amount in batch
+        )
+
+    def copy_records(self, batch):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        now = timezone.now().isoformat()
+        for budget, category, created_at, amount in batch:
+            writer.writerow((created_at.isoformat(), now, amount, budget, category if category else ""))
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {BudgetRecord._meta.db_table} (created_at, updated_at, amount, budget_id, category_id) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
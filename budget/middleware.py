@@ -0,0 +1,110 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_request_stats = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """SQL and serializer time of one request, collected as ``execute_wrapper`` of every connection."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            # parameters are not part of the SQL, so an N+1 repeats the very same string
+            self.queries[sql] += 1
+
+
+@contextmanager
+def serializer_timer():
+    """Add the time spent inside to the serializer time of the current request; nested calls are not counted twice."""
+    stats = _request_stats.get()
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_time += time.perf_counter() - started
+        stats.serializing = False
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Opt-in with ``REQUEST_INSTRUMENTATION``: adds SQL query count and time, serializer time
+    and response size of each request to a ``Server-Timing`` header and a JSON log line,
+    and warns when one SQL statement repeats ``REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD``
+    times or more, which is usually an N+1.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.duplicate_threshold = settings.REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        total_time = time.perf_counter() - started
+
+        queries = sum(stats.queries.values())
+        size = None if response.streaming else len(response.content)
+        response["Server-Timing"] = ", ".join(
+            (
+                f'db;dur={stats.db_time * 1000:.1f};desc="{queries} queries"',
+                f"serializer;dur={stats.serializer_time * 1000:.1f}",
+                f"total;dur={total_time * 1000:.1f}",
+            )
+            + ((f'size;desc="{size} bytes"',) if size is not None else ())
+        )
+
+        line = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": queries,
+            "db_ms": round(stats.db_time * 1000, 1),
+            "serializer_ms": round(stats.serializer_time * 1000, 1),
+            "total_ms": round(total_time * 1000, 1),
+            "response_bytes": size,
+        }
+        logger.info(json.dumps(line), extra={"request_stats": line})
+
+        duplicates = [
+            {"count": count, "sql": sql}
+            for sql, count in stats.queries.most_common()
+            if count >= self.duplicate_threshold
+        ]
+        if duplicates:
+            line = {"method": request.method, "path": request.path, "duplicates": duplicates}
+            logger.warning(json.dumps(line), extra={"request_stats": line})
+        return response
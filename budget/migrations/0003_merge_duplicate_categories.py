@@ -0,0 +1,27 @@
+# Generated by Django 4.0 on 2026-10-18 18:04
+
+from django.db import migrations
+
+
+def merge_duplicate_categories(apps, schema_editor):
+    BudgetCategory = apps.get_model('budget', 'BudgetCategory')
+    BudgetRecord = apps.get_model('budget', 'BudgetRecord')
+
+    kept = {}
+    for category in BudgetCategory.objects.order_by('id'):
+        if category.name not in kept:
+            kept[category.name] = category.id
+            continue
+        BudgetRecord.objects.filter(category_id=category.id).update(category_id=kept[category.name])
+        category.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0002_alter_budgetrecord_budget'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_categories, migrations.RunPython.noop),
+    ]
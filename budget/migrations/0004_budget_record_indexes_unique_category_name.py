@@ -0,0 +1,37 @@
+# Generated by Django 4.0 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0003_merge_duplicate_categories'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='budgetcategory',
+            name='name',
+            field=models.CharField(max_length=30, unique=True, verbose_name='name'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetrecord',
+            index=models.Index(fields=['budget', 'created_at', 'id'], name='record_budget_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetrecord',
+            index=models.Index(fields=['category', 'budget'], name='record_category_budget_idx'),
+        ),
+        migrations.AlterField(
+            model_name='budgetrecord',
+            name='budget',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='records', to='budget.budget'),
+        ),
+        migrations.AlterField(
+            model_name='budgetrecord',
+            name='category',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='records', to='budget.budgetcategory'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.0 on 2026-10-18 18:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0004_budget_record_indexes_unique_category_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='modified at')),
+                ('month', models.DateField(verbose_name='month')),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='income')),
+                ('expense', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='expense')),
+                ('records_count', models.IntegerField(default=0, verbose_name='records count')),
+                ('budget', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='totals', to='budget.budget')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='budget.budgetcategory')),
+            ],
+            options={
+                'verbose_name': 'budget total',
+                'verbose_name_plural': 'budget totals',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budgettotal',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('budget', 'category', 'month'), name='budget_total_category_month'),
+        ),
+        migrations.AddConstraint(
+            model_name='budgettotal',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('budget', 'month'), name='budget_total_month'),
+        ),
+    ]
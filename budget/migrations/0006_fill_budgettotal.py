@@ -0,0 +1,37 @@
+# Generated by Django 4.0 on 2026-10-18 18:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def fill_totals(apps, schema_editor):
+    BudgetRecord = apps.get_model('budget', 'BudgetRecord')
+    BudgetTotal = apps.get_model('budget', 'BudgetTotal')
+
+    total_field = models.DecimalField(max_digits=14, decimal_places=2)
+    rows = (
+        BudgetRecord.objects.exclude(budget=None)
+        .annotate(month=TruncMonth('created_at', output_field=models.DateField()))
+        .values('budget_id', 'category_id', 'month')
+        .annotate(
+            income=Coalesce(Sum('amount', filter=Q(amount__gt=0)), Decimal(0), output_field=total_field),
+            expense=Coalesce(Sum('amount', filter=Q(amount__lt=0)), Decimal(0), output_field=total_field),
+            records_count=Count('id'),
+        )
+        .order_by()
+    )
+    BudgetTotal.objects.bulk_create((BudgetTotal(**row) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0005_budgettotal'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
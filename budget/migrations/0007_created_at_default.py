@@ -0,0 +1,34 @@
+# Generated by Django 4.0 on 2026-10-18 18:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0006_fill_budgettotal'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='budget',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='created at'),
+        ),
+        migrations.AlterField(
+            model_name='budgetcategory',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='created at'),
+        ),
+        migrations.AlterField(
+            model_name='budgetrecord',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='created at'),
+        ),
+        migrations.AlterField(
+            model_name='budgettotal',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='created at'),
+        ),
+    ]
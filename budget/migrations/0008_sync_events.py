@@ -0,0 +1,43 @@
+# Generated by Django 4.0 on 2026-10-18 18:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('budget', '0007_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('deleted', 'deleted'), ('shared', 'shared')], max_length=10, verbose_name='action')),
+                ('model', models.CharField(choices=[('budget', 'budget'), ('record', 'record')], max_length=10, verbose_name='model')),
+                ('object_id', models.BigIntegerField(verbose_name='object id')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'sync event',
+                'verbose_name_plural': 'sync events',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='budgetrecord',
+            index=models.Index(fields=['budget', 'updated_at'], name='record_budget_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='syncevent',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='auth.user'),
+        ),
+        migrations.AddIndex(
+            model_name='syncevent',
+            index=models.Index(fields=['user', 'created_at'], name='sync_event_user_created_idx'),
+        ),
+    ]
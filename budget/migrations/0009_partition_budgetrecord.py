@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations
+
+from budget import partitions
+
+
+def partition_records(apps, schema_editor):
+    connection = schema_editor.connection
+    if not settings.RECORD_PARTITIONS or not partitions.is_supported(connection):
+        return
+    if not partitions.is_partitioned(connection):
+        partitions.partition_table(connection, ahead=settings.RECORD_PARTITIONS_AHEAD)
+
+
+def unpartition_records(apps, schema_editor):
+    connection = schema_editor.connection
+    if partitions.is_supported(connection) and partitions.is_partitioned(connection):
+        partitions.unpartition_table(connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0008_sync_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_records, unpartition_records),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0009_partition_budgetrecord'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budgetrecord',
+            index=models.Index(fields=['budget', 'amount', 'id'], name='record_budget_amount_idx'),
+        ),
+    ]
@@ -1,31 +1,99 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.cache import caches
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework.authtoken.models import Token
 
+from budget.authentication import token_cache
+from budget.routers import DEFAULT_DB
+
+TOTAL_FIELD = models.DecimalField(max_digits=14, decimal_places=2)
+
 
 class TimestampModel(models.Model):
-    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    # a default rather than auto_now_add, so imports can keep the original transaction time
+    created_at = models.DateTimeField(_("created at"), default=timezone.now, editable=False)
     updated_at = models.DateTimeField(_("modified at"), auto_now=True)
 
     class Meta:
         abstract = True
 
 
+class BudgetCategoryManager(models.Manager):
+    def get_or_create_by_names(self, names):
+        """
+        Map category names to categories with one lookup plus, when some names are
+        missing, one bulk insert and one re-read of the inserted names.
+        """
+        names = set(names)
+        categories = {category.name: category for category in self.filter(name__in=names)}
+        if missing := names - categories.keys():
+            # a concurrent request may insert the same name, the unique index keeps one row
+            self.bulk_create([self.model(name=name) for name in sorted(missing)], ignore_conflicts=True)
+            categories.update((category.name, category) for category in self.filter(name__in=missing))
+        return categories
+
+
 class BudgetCategory(TimestampModel):
-    name = models.CharField(verbose_name="name", max_length=30)
+    name = models.CharField(verbose_name="name", max_length=30, unique=True)
+
+    objects = BudgetCategoryManager()
 
     class Meta:
         verbose_name = _("budget category")
         verbose_name_plural = _("budget categories")
 
 
+class BudgetManager(models.Manager):
+    def accessible_ids(self, user, cached=True):
+        """
+        Ids of the budgets ``user`` owns, cached for ``ACCESSIBLE_BUDGETS_CACHE_TTL`` seconds,
+        so querysets filter on ``budget_id IN (...)`` instead of joining the owners table.
+        Owner changes and budget deletes drop the cached ids (see the receivers below).
+        With ``cached=False`` or the TTL at 0 it is the owners subquery.
+        """
+        owned = self.model.owners.through.objects.filter(user_id=user.pk).values("budget_id")
+        if not cached or not settings.ACCESSIBLE_BUDGETS_CACHE_TTL:
+            return owned
+        cache = caches[settings.ACCESSIBLE_BUDGETS_CACHE_ALIAS]
+        key = self._accessible_ids_key(user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            # read from the primary, a lagging replica would cache ids the invalidation already dropped
+            ids = [row["budget_id"] for row in owned.using(DEFAULT_DB)]
+            cache.set(key, ids, settings.ACCESSIBLE_BUDGETS_CACHE_TTL)
+        return ids
+
+    def forget_accessible_ids(self, user_ids):
+        keys = [self._accessible_ids_key(user_id) for user_id in user_ids]
+        if not keys:
+            return
+        cache = caches[settings.ACCESSIBLE_BUDGETS_CACHE_ALIAS]
+        cache.delete_many(keys)
+        # requests running until the change commits may cache the old ids again
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @staticmethod
+    def _accessible_ids_key(user_id):
+        return f"accessible-budgets:{user_id}"
+
+
 class Budget(TimestampModel):
     name = models.CharField(verbose_name="name", max_length=30)
     owners = models.ManyToManyField(User, related_name="budgets")
 
+    objects = BudgetManager()
+
     class Meta:
         verbose_name = _("budget")
         verbose_name_plural = _("budgets")
@@ -34,18 +102,293 @@ class Budget(TimestampModel):
 class BudgetRecord(TimestampModel):
     amount = models.DecimalField(verbose_name="amount", default=0, decimal_places=2, max_digits=6)
 
-    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, null=True, related_name="records")
-    category = models.ForeignKey(BudgetCategory, null=True, on_delete=models.PROTECT, related_name="records")
+    # single column FK indexes are left out, they are prefixes of the composite indexes below
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, null=True, related_name="records", db_index=False)
+    category = models.ForeignKey(
+        BudgetCategory, null=True, on_delete=models.PROTECT, related_name="records", db_index=False
+    )
 
     class Meta:
         verbose_name = _("budget record")
         verbose_name_plural = _("budget records")
+        indexes = [
+            models.Index(fields=["budget", "created_at", "id"], name="record_budget_created_idx"),
+            models.Index(fields=["category", "budget"], name="record_category_budget_idx"),
+            models.Index(fields=["budget", "updated_at"], name="record_budget_updated_idx"),
+            models.Index(fields=["budget", "amount", "id"], name="record_budget_amount_idx"),
+        ]
 
     def __str__(self):
         return f"+{self.amount}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding and self.pk:
+                previous = BudgetRecord.objects.filter(pk=self.pk).only("budget", "category", "created_at", "amount")
+                previous = previous.first()
+            super().save(*args, **kwargs)
+            if previous:
+                BudgetTotal.objects.add_records([previous], sign=-1)
+                if previous.budget_id != self.budget_id:
+                    # owners of the old budget only lose the record if they cannot see the new one
+                    SyncEvent.objects.log(
+                        SyncEvent.DELETED,
+                        "record",
+                        self.pk,
+                        owner_ids(previous.budget_id).difference(owner_ids(self.budget_id)),
+                    )
+            BudgetTotal.objects.add_records([self])
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            pk = self.pk
+            deleted = super().delete(*args, **kwargs)
+            BudgetTotal.objects.add_records([self], sign=-1)
+            SyncEvent.objects.log(SyncEvent.DELETED, "record", pk, owner_ids(self.budget_id))
+        return deleted
+
+
+def owner_ids(budget_id):
+    if budget_id is None:
+        return set()
+    return set(Budget.owners.through.objects.filter(budget_id=budget_id).values_list("user_id", flat=True))
+
+
+class BudgetTotalManager(models.Manager):
+    def add_records(self, records, sign=1):
+        """
+        Add (``sign=1``) or subtract (``sign=-1``) ``records`` from the running totals.
+        Record writes that bypass ``BudgetRecord.save``/``delete``, i.e. ``bulk_create``,
+        have to call this in the same transaction. Budget deletes cascade to the totals.
+        """
+        deltas = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+        amount_field = BudgetRecord._meta.get_field("amount")
+        for record in records:
+            if record.budget_id is None:
+                continue
+            amount = amount_field.to_python(record.amount)
+            delta = deltas[(record.budget_id, record.category_id, self.month_of(record.created_at))]
+            delta[0 if amount > 0 else 1] += amount * sign
+            delta[2] += sign
+
+        for (budget_id, category_id, month), (income, expense, records_count) in deltas.items():
+            self._upsert(
+                {"budget_id": budget_id, "category_id": category_id, "month": month}, income, expense, records_count
+            )
+
+    def _upsert(self, lookup, income, expense, records_count):
+        changes = {
+            "income": F("income") + income,
+            "expense": F("expense") + expense,
+            "records_count": F("records_count") + records_count,
+            "updated_at": timezone.now(),
+        }
+        if self.filter(**lookup).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                self.create(**lookup, income=income, expense=expense, records_count=records_count)
+        except IntegrityError:
+            # created concurrently since the update above
+            self.filter(**lookup).update(**changes)
+
+    @staticmethod
+    def month_of(value):
+        return timezone.localtime(value).date().replace(day=1)
+
+    def compute(self, budget_ids=None):
+        """Totals aggregated from the records themselves, in the shape of the stored rows."""
+        records = BudgetRecord.objects.exclude(budget=None)
+        if budget_ids is not None:
+            records = records.filter(budget_id__in=budget_ids)
+        return (
+            records.annotate(month=TruncMonth("created_at", output_field=DateField()))
+            .values("budget_id", "category_id", "month")
+            .annotate(
+                income=Coalesce(Sum("amount", filter=Q(amount__gt=0)), Decimal(0), output_field=TOTAL_FIELD),
+                expense=Coalesce(Sum("amount", filter=Q(amount__lt=0)), Decimal(0), output_field=TOTAL_FIELD),
+                records_count=Count("id"),
+            )
+            .order_by()
+        )
+
+    def rebuild(self, budget_ids=None):
+        with transaction.atomic():
+            stored = self.all() if budget_ids is None else self.filter(budget_id__in=budget_ids)
+            stored.delete()
+            self.bulk_create((self.model(**row) for row in self.compute(budget_ids)), batch_size=1000)
+
+    def verify(self, budget_ids=None):
+        """Keys ``(budget_id, category_id, month)`` whose stored totals differ from the records."""
+        stored = self.exclude(records_count=0, income=0, expense=0)
+        if budget_ids is not None:
+            stored = stored.filter(budget_id__in=budget_ids)
+
+        def by_key(rows):
+            return {
+                (row["budget_id"], row["category_id"], row["month"]): (
+                    row["income"],
+                    row["expense"],
+                    row["records_count"],
+                )
+                for row in rows
+            }
+
+        expected = by_key(self.compute(budget_ids))
+        actual = by_key(stored.values("budget_id", "category_id", "month", "income", "expense", "records_count"))
+        return sorted(
+            (key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key)),
+            key=lambda key: (key[0], key[1] or 0, key[2]),
+        )
+
+
+class BudgetTotal(TimestampModel):
+    """Running income/expense/count of a budget's records per category and month."""
+
+    # indexed through the unique constraints, which lead with budget
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name="totals", db_index=False)
+    category = models.ForeignKey(BudgetCategory, null=True, on_delete=models.CASCADE, related_name="+")
+    month = models.DateField(verbose_name="month")
+    income = models.DecimalField(verbose_name="income", default=0, decimal_places=2, max_digits=14)
+    expense = models.DecimalField(verbose_name="expense", default=0, decimal_places=2, max_digits=14)
+    records_count = models.IntegerField(verbose_name="records count", default=0)
+
+    objects = BudgetTotalManager()
+
+    class Meta:
+        verbose_name = _("budget total")
+        verbose_name_plural = _("budget totals")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["budget", "category", "month"],
+                condition=Q(category__isnull=False),
+                name="budget_total_category_month",
+            ),
+            models.UniqueConstraint(
+                fields=["budget", "month"], condition=Q(category__isnull=True), name="budget_total_month"
+            ),
+        ]
+
+
+class SyncEventManager(models.Manager):
+    def log(self, action, model, object_id, user_ids):
+        self.bulk_create(
+            [self.model(user_id=user_id, action=action, model=model, object_id=object_id) for user_id in user_ids]
+        )
+
+    @staticmethod
+    def retained_since():
+        """Oldest ``created_at`` the log keeps, ``SYNC_EVENT_RETENTION_DAYS`` back."""
+        return timezone.now() - timedelta(days=settings.SYNC_EVENT_RETENTION_DAYS)
+
+    def prune(self):
+        """Delete the events older than the retention window, returns how many."""
+        deleted, _ = self.filter(created_at__lt=self.retained_since()).delete()
+        return deleted
+
+
+class SyncEvent(models.Model):
+    """
+    Tombstone log for ``/sync``: per user, budgets and records that were deleted or are
+    no longer visible to the user, plus budgets shared with the user, whose records
+    ``updated_at`` alone would not bring along.
+    """
+
+    DELETED = "deleted"
+    SHARED = "shared"
+    ACTIONS = ((DELETED, _("deleted")), (SHARED, _("shared")))
+    MODELS = (("budget", _("budget")), ("record", _("record")))
+
+    # indexed through the composite index below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_index=False)
+    action = models.CharField(verbose_name="action", max_length=10, choices=ACTIONS)
+    model = models.CharField(verbose_name="model", max_length=10, choices=MODELS)
+    object_id = models.BigIntegerField(verbose_name="object id")
+    created_at = models.DateTimeField(_("created at"), default=timezone.now, editable=False)
+
+    objects = SyncEventManager()
+
+    class Meta:
+        verbose_name = _("sync event")
+        verbose_name_plural = _("sync events")
+        indexes = [models.Index(fields=["user", "created_at"], name="sync_event_user_created_idx")]
+
 
 @receiver(post_save, sender=User)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
         Token.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance, created=False, **kwargs):
+    # the cached user may be deactivated or changed otherwise
+    if not created:
+        token_cache.delete(*Token.objects.filter(user=instance).values_list("key", flat=True))
+
+
+@receiver(m2m_changed, sender=Budget.owners.through)
+def touch_budgets_on_owners_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # owner changes do not save the budget, but have to change its version for response caching
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        budget_ids = [instance.pk]
+    elif pk_set is not None:
+        budget_ids = pk_set
+    else:
+        budget_ids = Budget.objects.filter(owners=instance).values("id")
+    Budget.objects.filter(pk__in=budget_ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Budget.owners.through)
+def forget_accessible_budgets_on_owners_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove"):
+        Budget.objects.forget_accessible_ids([instance.pk] if reverse else pk_set)
+    elif action == "pre_clear":
+        Budget.objects.forget_accessible_ids([instance.pk] if reverse else owner_ids(instance.pk))
+
+
+@receiver(pre_delete, sender=Budget)
+def forget_accessible_budgets_on_delete(sender, instance, **kwargs):
+    Budget.objects.forget_accessible_ids(owner_ids(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def forget_accessible_budgets_of_new_user(sender, instance, created=False, **kwargs):
+    # a new user may get the id of a deleted one, whose ids could still be cached
+    if created:
+        Budget.objects.forget_accessible_ids([instance.pk])
+
+
+@receiver(m2m_changed, sender=Budget.owners.through)
+def log_owner_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        lookup = {"user": instance} if reverse else {"budget": instance}
+        pairs = sender.objects.filter(**lookup).values_list("budget_id", "user_id")
+    elif action in ("post_add", "post_remove"):
+        pairs = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+    else:
+        return
+    SyncEvent.objects.bulk_create(
+        SyncEvent(
+            user_id=user_id,
+            action=SyncEvent.SHARED if action == "post_add" else SyncEvent.DELETED,
+            model="budget",
+            object_id=budget_id,
+        )
+        for budget_id, user_id in pairs
+    )
+
+
+@receiver(pre_delete, sender=Budget)
+def log_budget_delete(sender, instance, **kwargs):
+    # records of a deleted budget get no tombstones of their own, clients drop them with the budget
+    SyncEvent.objects.log(SyncEvent.DELETED, "budget", instance.pk, owner_ids(instance.pk))
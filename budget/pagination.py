@@ -0,0 +1,208 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict, namedtuple
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination, _positive_int, _reverse_ordering
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = namedtuple("Cursor", ["position", "reverse"])
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Seek ("keyset") pagination: every page is a ``WHERE (created_at, id) < (...)``
+    range scan, so there is no COUNT(*) and no OFFSET, and deep pages cost the
+    same as the first one.
+
+    The cursor holds the ordering values of the boundary row. The last ordering
+    column has to be unique (``id``) so that ties on ``created_at`` never skip
+    or repeat rows. Views can override the columns with ``keyset_ordering``.
+    """
+
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = 100
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self._page_queryset(queryset, request, view)
+        return self._set_page(list(queryset), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self._page_queryset(queryset, request, view)
+        return self._set_page([row async for row in queryset], cursor)
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(view)
+        self.fields = [self._field_name(field) for field in self.ordering]
+        cursor = self.decode_cursor(request, queryset.model)
+
+        ordering = _reverse_ordering(self.ordering) if cursor and cursor.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(ordering, cursor.position))
+        return queryset[: self.limit + 1], cursor
+
+    def _set_page(self, rows, cursor):
+        has_more = len(rows) > self.limit
+        rows = rows[: self.limit]
+
+        if cursor and cursor.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, "keyset_ordering", self.ordering))
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(request.query_params[self.limit_query_param], strict=True, cutoff=self.max_limit)
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(position=self._position(self.page[-1]), reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(Cursor(position=self._position(self.page[0]), reverse=True))
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            position = payload["p"]
+            if len(position) != len(self.fields):
+                raise ValueError
+            values = [model._meta.get_field(field).to_python(value) for field, value in zip(self.fields, position)]
+            return Cursor(position=values, reverse=bool(payload.get("r")))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        payload = {"p": [self._serialize(value) for value in cursor.position]}
+        if cursor.reverse:
+            payload["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("ascii")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def _position(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
+
+    @staticmethod
+    def _field_name(ordering_field):
+        return ordering_field.lstrip("-")
+
+    def _seek_filter(self, ordering, position):
+        """
+        Expand ``(a, b, c) > (x, y, z)`` into ``a > x OR (a = x AND b > y) OR ...``
+        honouring the direction of every column.
+        """
+        conditions = []
+        for index, ordering_field in enumerate(ordering):
+            field = self._field_name(ordering_field)
+            lookup = "lt" if ordering_field.startswith("-") else "gt"
+            equal = {name: value for name, value in zip(self.fields[:index], position[:index])}
+            conditions.append(Q(**equal, **{f"{field}__{lookup}": position[index]}))
+        return reduce(or_, conditions)
+
+    @staticmethod
+    def _serialize(value):
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        if isinstance(value, int):
+            return value
+        return str(value)
+
+
+class SyncRecordPagination(KeysetCursorPagination):
+    """``/sync`` records in the order they changed, so a page never skips a later change."""
+
+    ordering = ("updated_at", "id")
+    default_limit = 500
+    max_limit = 1000
+
+
+class LimitOffsetOrCursorPagination(LimitOffsetPagination):
+    """
+    Default ``limit``/``offset`` pagination, unchanged for existing clients.
+    Sending ``?pagination=cursor`` (or following a ``cursor`` link) switches the
+    request to ``KeysetCursorPagination``.
+    """
+
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+    cursor_pagination_class = KeysetCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = self.cursor_pagination_class() if self.wants_cursor(request) else None
+        if self.cursor_paginator:
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` with the async ORM, for the async views."""
+        self.cursor_paginator = self.cursor_pagination_class() if self.wants_cursor(request) else None
+        if self.cursor_paginator:
+            return await self.cursor_paginator.apaginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [row async for row in queryset[self.offset : self.offset + self.limit]]
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def wants_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
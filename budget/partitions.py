@@ -0,0 +1,197 @@
+"""
+Monthly partitions of the budget record table on PostgreSQL.
+
+``partition_table`` turns ``budget_budgetrecord`` into a table partitioned by range
+of ``created_at``: one partition per month (in ``TIME_ZONE``, like ``BudgetTotal``
+months) plus a default partition for the rows no month partition holds. PostgreSQL
+needs the partition key in unique constraints, so the primary key becomes
+``(id, created_at)``; ids still come from a single sequence and the ORM keeps
+using ``id`` alone. Queries filtered by a ``created_at`` range only scan the
+partitions of those months.
+
+Everything here takes the connection to use and does not import the models, so
+migrations can call it.
+"""
+from datetime import date, datetime, time
+
+from django.db import transaction
+from django.utils import timezone
+
+TABLE = "budget_budgetrecord"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_PREFIX = f"{TABLE}_p"
+TOTALS_TABLE = "budget_budgettotal"
+
+
+def is_supported(connection):
+    return connection.vendor == "postgresql"
+
+
+def is_partitioned(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)", [TABLE])
+        return cursor.fetchone()[0]
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(first, last):
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def current_month():
+    return timezone.localdate().replace(day=1)
+
+
+def partition_name(month):
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+
+def partitions(connection):
+    """Attached month partitions as ``{first day of the month: table name}``."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return {
+        datetime.strptime(name[len(PARTITION_PREFIX) :], "%Y_%m").date(): name
+        for name in names
+        if name.startswith(PARTITION_PREFIX)
+    }
+
+
+def create_partitions(connection, last):
+    """
+    Add the missing month partitions from the newest attached one up to ``last``.
+    Rows of those months that went to the default partition so far are moved
+    into the new partition before it is attached.
+    """
+    existing = partitions(connection)
+    first = max(existing, default=current_month())
+    created = []
+    for month in months_between(first, last):
+        if month in existing:
+            continue
+        start, end = _bounds(month)
+        name = partition_name(month)
+        # created standalone and attached, which locks the parent table less than PARTITION OF
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE created_at >= {start} AND created_at < {end} '
+                f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved'
+            )
+            cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM ({start}) TO ({end})')
+        created.append(name)
+    return created
+
+
+def detach_partitions(connection, before):
+    """
+    Detach the month partitions older than ``before``. The detached tables keep
+    their rows, but the records are gone from every query: their amounts leave the
+    month's running totals and the tables lose their foreign keys, so the budgets
+    and categories they point to can still be deleted.
+    """
+    detached = []
+    for month, name in sorted(partitions(connection).items()):
+        if month >= before:
+            break
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            # partition bounds are the totals' months, so all rows of the partition are in the month's totals
+            cursor.execute(
+                f'UPDATE "{TOTALS_TABLE}" AS total SET income = total.income - detached.income, '
+                "expense = total.expense - detached.expense, "
+                "records_count = total.records_count - detached.records_count, updated_at = %s "
+                "FROM (SELECT budget_id, category_id, "
+                "COALESCE(SUM(amount) FILTER (WHERE amount > 0), 0) AS income, "
+                "COALESCE(SUM(amount) FILTER (WHERE amount < 0), 0) AS expense, COUNT(*) AS records_count "
+                f'FROM "{name}" WHERE budget_id IS NOT NULL GROUP BY budget_id, category_id) AS detached '
+                "WHERE total.budget_id = detached.budget_id "
+                "AND total.category_id IS NOT DISTINCT FROM detached.category_id AND total.month = %s",
+                [timezone.now(), month],
+            )
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", [name])
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE "{name}" DROP CONSTRAINT "{constraint}"')
+        detached.append(name)
+    return detached
+
+
+def partition_table(connection, ahead):
+    """
+    Rebuild the record table partitioned, with month partitions from the oldest
+    record's month to ``ahead`` months from now.
+    """
+    _rebuild_table(connection, partitioned=True, ahead=ahead)
+
+
+def unpartition_table(connection):
+    """Rebuild the record table as a plain table; detached partitions are left alone."""
+    _rebuild_table(connection, partitioned=False)
+
+
+def _rebuild_table(connection, partitioned, ahead=0):
+    old = f"{TABLE}_old"
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{old}"')
+        # constraint and index names stay as Django created them, so later migrations still find them
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [old],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT index_class.relname, pg_get_indexdef(index_class.oid) FROM pg_index "
+            "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+            "WHERE pg_index.indrelid = %s::regclass AND NOT pg_index.indisprimary",
+            [old],
+        )
+        indexes = [(name, definition.split(" USING ", 1)[1]) for name, definition in cursor.fetchall()]
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [old])
+        # the sequence goes on where it was, ids of deleted records are in the sync log and must not come back
+        cursor.execute(f"SELECT last_value, is_called FROM {cursor.fetchone()[0]}")
+        last_value, is_called = cursor.fetchone()
+
+        if partitioned:
+            cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{old}") PARTITION BY RANGE (created_at)')
+            cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+            cursor.execute(f'SELECT MIN(created_at) FROM "{old}"')
+            oldest = cursor.fetchone()[0]
+            first = timezone.localtime(oldest).date() if oldest else current_month()
+            for month in months_between(min(first, current_month()), add_months(current_month(), ahead)):
+                name, (start, end) = partition_name(month), _bounds(month)
+                cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{TABLE}" FOR VALUES FROM ({start}) TO ({end})')
+        else:
+            cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{old}")')
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{old}"')
+        # dropping a partitioned table drops its partitions
+        cursor.execute(f'DROP TABLE "{old}"')
+
+        cursor.execute(f'CREATE SEQUENCE "{TABLE}_id_seq" OWNED BY "{TABLE}".id')
+        cursor.execute(f"SELECT setval('\"{TABLE}_id_seq\"', %s, %s)", [last_value, is_called])
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(\'"{TABLE}_id_seq"\')')
+        primary_key = "id, created_at" if partitioned else "id"
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ({primary_key})')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        for name, definition in indexes:
+            cursor.execute(f'CREATE INDEX "{name}" ON "{TABLE}" USING {definition}')
+
+
+def _bounds(month):
+    """``created_at`` literals of the month's start and the next month's start, local midnights."""
+    return tuple(
+        f"'{timezone.make_aware(datetime.combine(day, time.min)).isoformat()}'" for day in (month, add_months(month, 1))
+    )
@@ -0,0 +1,52 @@
+"""
+JSON renderer and parser on top of ``orjson`` when it is installed. The output is
+byte for byte the one of DRF's ``JSONRenderer``: compact separators, UTF-8, U+2028 and
+U+2029 escaped, datetimes with ``Z`` for UTC, everything orjson does not know passed to
+DRF's encoder. Without orjson, for indented output (the browsable API) and for the
+``UNICODE_JSON`` / ``COMPACT_JSON`` settings off, they fall back to the DRF classes.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Decimals become JSON numbers as in DRF, the ones serializers return as strings are
+    left alone. Floats outside of [1e-4, 1e16) differ in the exponent notation only
+    (``1e16`` instead of ``1e+16``).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        rendered = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        return rendered.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,131 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from budget.models import BudgetRecord, BudgetTotal
+
+SERIES_BUCKETS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+
+
+def date_range_filter(date_from=None, date_to=None, field="created_at"):
+    """
+    ``date_from``/``date_to`` are inclusive dates. They are turned into a
+    half-open datetime range, so the filter stays a plain range on the column.
+    """
+    filters = Q()
+    if date_from:
+        filters &= Q(**{f"{field}__gte": _start_of_day(date_from)})
+    if date_to:
+        filters &= Q(**{f"{field}__lt": _start_of_day(date_to + timedelta(days=1))})
+    return filters
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _is_whole_months(date_from, date_to):
+    return (not date_from or date_from.day == 1) and (not date_to or (date_to + timedelta(days=1)).day == 1)
+
+
+def _category_rows_from_totals(budget_ids, date_from, date_to):
+    totals = BudgetTotal.objects.filter(budget_id__in=budget_ids)
+    if date_from:
+        totals = totals.filter(month__gte=date_from)
+    if date_to:
+        totals = totals.filter(month__lte=date_to)
+    return (
+        totals.values("budget_id", "category_id", "category__name")
+        .annotate(income=Sum("income"), expense=Sum("expense"), records_count=Sum("records_count"))
+        .filter(records_count__gt=0)
+        .order_by("budget_id", "category_id")
+    )
+
+
+def _category_rows_from_records(budget_ids, date_from, date_to):
+    return (
+        BudgetRecord.objects.filter(date_range_filter(date_from, date_to), budget_id__in=budget_ids)
+        .values("budget_id", "category_id", "category__name")
+        .annotate(
+            income=Sum("amount", filter=Q(amount__gt=0)),
+            expense=Sum("amount", filter=Q(amount__lt=0)),
+            records_count=Count("id"),
+        )
+        .order_by("budget_id", "category_id")
+    )
+
+
+def _totals(income=None, expense=None, records_count=0):
+    income, expense = income or Decimal(0), expense or Decimal(0)
+    return {"income": income, "expense": expense, "balance": income + expense, "records_count": records_count}
+
+
+def budget_summaries(budget_ids, date_from=None, date_to=None):
+    """
+    Totals and per-category breakdown for every budget in ``budget_ids``, from a
+    single query grouped by (budget, category). Ranges made of whole months are
+    read from the ``BudgetTotal`` running totals, so their cost does not depend
+    on the number of records; other ranges are aggregated from the records.
+    """
+    return _summaries_from_rows(budget_ids, _category_rows(budget_ids, date_from, date_to))
+
+
+async def abudget_summaries(budget_ids, date_from=None, date_to=None):
+    """``budget_summaries`` read with the async ORM."""
+    rows = [row async for row in _category_rows(budget_ids, date_from, date_to)]
+    return _summaries_from_rows(budget_ids, rows)
+
+
+def _category_rows(budget_ids, date_from, date_to):
+    if _is_whole_months(date_from, date_to):
+        return _category_rows_from_totals(budget_ids, date_from, date_to)
+    return _category_rows_from_records(budget_ids, date_from, date_to)
+
+
+def _summaries_from_rows(budget_ids, rows):
+    categories = {budget_id: [] for budget_id in budget_ids}
+    for row in rows:
+        categories[row["budget_id"]].append(
+            {
+                "category": row["category_id"],
+                "name": row["category__name"],
+                **_totals(row["income"], row["expense"], row["records_count"]),
+            }
+        )
+
+    return [
+        {
+            "budget": budget_id,
+            **_totals(
+                sum((category["income"] for category in budget_categories), Decimal(0)),
+                sum((category["expense"] for category in budget_categories), Decimal(0)),
+                sum(category["records_count"] for category in budget_categories),
+            ),
+            "categories": budget_categories,
+        }
+        for budget_id, budget_categories in categories.items()
+    ]
+
+
+def spending_series(records, bucket):
+    """
+    Income/expense per ``bucket`` (day, week or month) of ``created_at`` for the
+    ``records`` queryset, as one ``date_trunc`` + GROUP BY query.
+    """
+    truncate = SERIES_BUCKETS[bucket]("created_at", output_field=DateField())
+    rows = (
+        records.order_by()
+        .prefetch_related(None)
+        .annotate(bucket=truncate)
+        .values("bucket")
+        .annotate(
+            income=Sum("amount", filter=Q(amount__gt=0)),
+            expense=Sum("amount", filter=Q(amount__lt=0)),
+            records_count=Count("id"),
+        )
+        .order_by("bucket")
+    )
+    return [{"bucket": row["bucket"], **_totals(row["income"], row["expense"], row["records_count"])} for row in rows]
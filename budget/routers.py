@@ -0,0 +1,82 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+
+DEFAULT_DB = "default"
+
+# database the ORM reads from in the current request, set by ReplicaReadMixin
+read_db = ContextVar("read_db", default=None)
+
+
+def _sticky_key(user):
+    return f"replica-sticky:{user.pk}"
+
+
+def stick_to_primary(user):
+    """Send the reads of ``user`` to the primary for the next ``REPLICA_STICKINESS`` seconds."""
+    if settings.DATABASE_REPLICAS and user.is_authenticated:
+        caches[settings.REPLICA_CACHE_ALIAS].set(_sticky_key(user), True, settings.REPLICA_STICKINESS)
+
+
+def read_db_for(user):
+    """A random replica, or the primary while ``user`` may not see their last write on the replicas yet."""
+    if not settings.DATABASE_REPLICAS:
+        return DEFAULT_DB
+    if user.is_authenticated and caches[settings.REPLICA_CACHE_ALIAS].get(_sticky_key(user)):
+        return DEFAULT_DB
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """
+    Writes go to the primary. Reads go to ``read_db`` when a view set it and to the
+    primary otherwise, so only views that opt in with ``ReplicaReadMixin`` can see
+    replication lag.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_db.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        databases = {DEFAULT_DB, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    GET requests of the view read from ``read_db_for(user)``; other methods read from
+    and write to the primary and keep the user on the primary for a while, so they
+    read their own writes. The database is in ``self.read_db`` for querysets that
+    are evaluated after the view returns, like streamed responses.
+    """
+
+    read_db = DEFAULT_DB
+
+    def dispatch(self, request, *args, **kwargs):
+        token = read_db.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            read_db.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self.read_db = read_db_for(request.user)
+        else:
+            stick_to_primary(request.user)
+        read_db.set(self.read_db)
@@ -1,7 +1,16 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 
-from budget.models import Budget, BudgetCategory, BudgetRecord
+from budget.middleware import serializer_timer
+from budget.models import Budget, BudgetCategory, BudgetRecord, BudgetTotal
+from budget.reports import SERIES_BUCKETS
+from budget.utils import TimedSerializerMixin
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -22,9 +31,11 @@ class BudgetCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = BudgetCategory
         fields = "__all__"
+        # nested categories are looked up by name, an existing name is not an error
+        extra_kwargs = {"name": {"validators": []}}
 
 
-class BudgetRecordSerializer(serializers.ModelSerializer):
+class BudgetRecordSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category = BudgetCategorySerializer(required=False, allow_null=True)
 
     class Meta:
@@ -32,7 +43,7 @@ class BudgetRecordSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class BudgetRecordCreateSerializer(serializers.ModelSerializer):
+class BudgetRecordCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category = BudgetCategorySerializer(required=False, allow_null=True)
     budget = serializers.PrimaryKeyRelatedField(queryset=Budget.objects.all(), required=True)
 
@@ -41,23 +52,267 @@ class BudgetRecordCreateSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class BudgetSerializer(serializers.ModelSerializer):
-    records = BudgetRecordSerializer(many=True, required=False, allow_null=True)
+class BudgetRecordBulkSerializer(serializers.ModelSerializer):
+    """
+    Single item of a bulk create. Budgets and categories are resolved from the
+    ``budgets`` / ``categories`` dicts the view pre-fetches into the context, so
+    validating an item does not touch the database.
+    """
+
+    budget = serializers.IntegerField()
+    category = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = BudgetRecord
+        fields = ("amount", "budget", "category")
+
+    def validate_budget(self, value):
+        return self._get_prefetched("budgets", value)
+
+    def validate_category(self, value):
+        if value is None:
+            return None
+        return self._get_prefetched("categories", value)
+
+    def _get_prefetched(self, key, pk):
+        try:
+            return self.context[key][pk]
+        except KeyError:
+            raise serializers.ValidationError(f'Invalid pk "{pk}" - object does not exist.')
+
+
+class BudgetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    records = BudgetRecordSerializer(many=True, required=False, allow_null=True, write_only=True)
     records_count = serializers.ReadOnlyField()
+    income = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
+    expense = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
 
     class Meta:
         model = Budget
-        fields = ("id", "name", "owners", "records_count", "records", "created_at", "updated_at")
+        fields = ("id", "name", "owners", "records_count", "income", "expense", "records", "created_at", "updated_at")
 
     def create(self, validated_data):
         records = validated_data.pop("records", None)
-        budget = super().create(validated_data)
-        if records:
-            for record in records:
-                budget_category = None
-                if category := record.pop("category", None):
-                    budget_category = BudgetCategory.objects.get_or_create(**category)[0]
+        with transaction.atomic():
+            budget = super().create(validated_data)
+            if records:
+                categories = BudgetCategory.objects.get_or_create_by_names(
+                    record["category"]["name"] for record in records if record.get("category")
+                )
+                budget_records = []
+                for record in records:
+                    budget_category = None
+                    if category := record.pop("category", None):
+                        budget_category = categories[category["name"]]
 
-                BudgetRecord.objects.create(budget=budget, category=budget_category, **record)
+                    budget_records.append(BudgetRecord(budget=budget, category=budget_category, **record))
+                BudgetRecord.objects.bulk_create(budget_records)
+                BudgetTotal.objects.add_records(budget_records)
 
         return budget
+
+
+class BudgetWithRecordsSerializer(BudgetSerializer):
+    records = BudgetRecordSerializer(many=True, read_only=True)
+
+
+class BudgetWithLatestRecordsSerializer(BudgetSerializer):
+    latest_records = BudgetRecordSerializer(many=True, read_only=True)
+
+    class Meta(BudgetSerializer.Meta):
+        fields = BudgetSerializer.Meta.fields + ("latest_records",)
+
+
+def _datetime(value, tz):
+    """``DateTimeField.to_representation`` with ISO 8601 output."""
+    if not value:
+        return None
+    if tz is not None:
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+def _decimal(value, exponent=Decimal("0.01")):
+    """``DecimalField(decimal_places=2).to_representation`` with decimals coerced to strings."""
+    if value is None:
+        return None
+    return f"{value.quantize(exponent):f}"
+
+
+class ValuesSerializer:
+    """
+    Read-only counterpart of a ``ModelSerializer`` for list pages. ``values`` narrows the
+    queryset to plain row dicts and ``data`` builds the same output as the serializer
+    from them, without model instances and per-field ``to_representation`` calls.
+    """
+
+    fields = ()
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.fields)
+
+    @property
+    def data(self):
+        with serializer_timer():
+            rows = list(self.rows)
+            tz = timezone.get_current_timezone() if settings.USE_TZ else None
+            return [self.to_representation(row, tz) for row in self.prepare(rows)]
+
+    def prepare(self, rows):
+        return rows
+
+    def to_representation(self, row, tz):
+        raise NotImplementedError
+
+
+class BudgetRecordValuesSerializer(ValuesSerializer):
+    """``BudgetRecordSerializer`` output, with the category joined into the same query."""
+
+    fields = (
+        *("id", "amount", "budget_id", "created_at", "updated_at"),
+        *("category_id", "category__name", "category__created_at", "category__updated_at"),
+    )
+
+    def to_representation(self, row, tz):
+        category = None
+        if row["category_id"] is not None:
+            category = {
+                "id": row["category_id"],
+                "created_at": _datetime(row["category__created_at"], tz),
+                "updated_at": _datetime(row["category__updated_at"], tz),
+                "name": row["category__name"],
+            }
+        return {
+            "id": row["id"],
+            "category": category,
+            "created_at": _datetime(row["created_at"], tz),
+            "updated_at": _datetime(row["updated_at"], tz),
+            "amount": _decimal(row["amount"]),
+            "budget": row["budget_id"],
+        }
+
+
+class BudgetValuesSerializer(ValuesSerializer):
+    """``BudgetSerializer`` output; owners come from one query on the through table, ordered by id."""
+
+    fields = ("id", "name", "records_count", "income", "expense", "created_at", "updated_at")
+
+    def prepare(self, rows):
+        self.owners = defaultdict(list)
+        owners = Budget.owners.through.objects.filter(budget_id__in=[row["id"] for row in rows])
+        for budget_id, user_id in owners.order_by("user_id").values_list("budget_id", "user_id"):
+            self.owners[budget_id].append(user_id)
+        return rows
+
+    def to_representation(self, row, tz):
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "owners": self.owners[row["id"]],
+            "records_count": row["records_count"],
+            "income": _decimal(row["income"]),
+            "expense": _decimal(row["expense"]),
+            "created_at": _datetime(row["created_at"], tz),
+            "updated_at": _datetime(row["updated_at"], tz),
+        }
+
+
+class DateRangeSerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get("date_from") and attrs.get("date_to") and attrs["date_from"] > attrs["date_to"]:
+            raise serializers.ValidationError({"date_to": "date_to must not be before date_from."})
+        return attrs
+
+
+class BudgetQuerySerializer(DateRangeSerializer):
+    """``/budgets`` filters; ``budget`` selects the budgets of ``/budgets/summary``."""
+
+    budget = serializers.ListField(child=serializers.IntegerField(), required=False)
+    category = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
+class SeriesQuerySerializer(DateRangeSerializer):
+    bucket = serializers.ChoiceField(choices=list(SERIES_BUCKETS), default="month")
+
+
+# keyset orderings, id last so cursor pages never skip or repeat rows with the same value
+RECORD_ORDERINGS = {
+    "-created_at": ("-created_at", "-id"),
+    "created_at": ("created_at", "id"),
+    "-amount": ("-amount", "-id"),
+    "amount": ("amount", "id"),
+}
+
+
+class RecordQuerySerializer(DateRangeSerializer):
+    """``/records`` filters, all of them have to match."""
+
+    budget = serializers.IntegerField(required=False)
+    category = serializers.ListField(child=serializers.IntegerField(), required=False)
+    type = serializers.ChoiceField(choices=["income", "expense"], required=False)
+    amount_min = serializers.DecimalField(max_digits=6, decimal_places=2, required=False)
+    amount_max = serializers.DecimalField(max_digits=6, decimal_places=2, required=False)
+    ordering = serializers.ChoiceField(choices=list(RECORD_ORDERINGS), default="-created_at")
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if "amount_min" in attrs and "amount_max" in attrs and attrs["amount_min"] > attrs["amount_max"]:
+            raise serializers.ValidationError({"amount_max": "amount_max must not be below amount_min."})
+        return attrs
+
+
+class TotalsSerializer(TimedSerializerMixin, serializers.Serializer):
+    income = serializers.DecimalField(max_digits=None, decimal_places=2)
+    expense = serializers.DecimalField(max_digits=None, decimal_places=2)
+    balance = serializers.DecimalField(max_digits=None, decimal_places=2)
+    records_count = serializers.IntegerField()
+
+
+class CategoryTotalsSerializer(TotalsSerializer):
+    category = serializers.IntegerField(allow_null=True)
+    name = serializers.CharField(allow_null=True)
+
+
+class BudgetSummarySerializer(TotalsSerializer):
+    budget = serializers.IntegerField()
+    categories = CategoryTotalsSerializer(many=True)
+
+
+class SeriesPointSerializer(TotalsSerializer):
+    bucket = serializers.DateField()
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    # set by the next links, every page of one sync ends at the first page's watermark
+    watermark = serializers.DateTimeField(required=False)
+
+
+class SyncBudgetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Budget
+        fields = ("id", "name", "owners", "created_at", "updated_at")
+
+
+class SyncRecordSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = BudgetRecord
+        fields = ("id", "amount", "budget", "category", "created_at", "updated_at")
+
+
+class SyncSerializer(serializers.Serializer):
+    since = serializers.DateTimeField(allow_null=True)
+    watermark = serializers.DateTimeField()
+    next = serializers.URLField(allow_null=True)
+    budgets = SyncBudgetSerializer(many=True)
+    records = SyncRecordSerializer(many=True)
+    categories = BudgetCategorySerializer(many=True)
+    deleted = serializers.DictField(child=serializers.ListField(child=serializers.IntegerField()))
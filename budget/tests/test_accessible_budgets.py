@@ -0,0 +1,101 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from budget.factory import BudgetFactory, ExpenseBudgetFactory
+from budget.models import Budget
+from budget.tests.test_views import BaseTestCase
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, ACCESSIBLE_BUDGETS_CACHE_TTL=60)
+class AccessibleBudgetsTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.home_record = ExpenseBudgetFactory.create(budget=self.home_budget, category=self.food_category)
+        self.vacation_budget = BudgetFactory.create(name="vacation", owners=[self.star_lord])
+        self.vacation_record = ExpenseBudgetFactory.create(budget=self.vacation_budget, category=self.food_category)
+        self.authorize(self.batman)
+
+    def record_ids(self):
+        return {record["id"] for record in self.client.get(reverse("budgetrecord-list")).data["results"]}
+
+    def test_ids_are_cached(self):
+        self.assertEqual(Budget.objects.accessible_ids(self.batman), [self.home_budget.id])
+        with self.assertNumQueries(0):
+            Budget.objects.accessible_ids(self.batman)
+
+    def test_record_list_does_not_join_the_owners_table(self):
+        self.client.get(reverse("budgetrecord-list"))
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(reverse("budgetrecord-list")).status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in context.captured_queries if "budget_budget_owners" in query["sql"]])
+
+    def test_added_owner_sees_the_budget(self):
+        self.assertEqual(self.record_ids(), {self.home_record.id})
+        self.vacation_budget.owners.add(self.batman)
+        self.assertEqual(self.record_ids(), {self.home_record.id, self.vacation_record.id})
+
+    def test_removed_owner_loses_access(self):
+        self.home_budget.owners.add(self.star_lord)
+        self.assertEqual(self.record_ids(), {self.home_record.id})
+        self.batman.budgets.remove(self.home_budget)
+
+        self.assertEqual(self.record_ids(), set())
+        budget_url = reverse("budget-detail", args=(self.home_budget.id,))
+        record_url = reverse("budgetrecord-detail", args=(self.home_record.id,))
+        for url in (budget_url, record_url):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+            response = self.client.patch(url, {"name": "mine", "amount": "1.00"}, content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "process-1"},
+            "process-2": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "process-2"},
+        }
+    )
+    def test_removed_owner_loses_access_in_other_processes(self):
+        self.assertEqual(self.record_ids(), {self.home_record.id})
+        # removed while serving a request in another process with its own cache
+        with self.settings(ACCESSIBLE_BUDGETS_CACHE_ALIAS="process-2"):
+            self.batman.budgets.remove(self.home_budget)
+
+        # this process still lists from the stale ids, but details and writes check the owners
+        self.assertEqual(self.record_ids(), {self.home_record.id})
+        budget_url = reverse("budget-detail", args=(self.home_budget.id,))
+        record_url = reverse("budgetrecord-detail", args=(self.home_record.id,))
+        for url in (budget_url, record_url):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+            response = self.client.patch(url, {"name": "mine", "amount": "1.00"}, content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cleared_owners_lose_access(self):
+        self.assertEqual(self.record_ids(), {self.home_record.id})
+        self.home_budget.owners.clear()
+        self.assertEqual(self.record_ids(), set())
+
+    def test_deleted_budget_is_forgotten(self):
+        self.assertEqual(Budget.objects.accessible_ids(self.batman), [self.home_budget.id])
+        response = self.client.delete(reverse("budget-detail", args=(self.home_budget.id,)))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Budget.objects.accessible_ids(self.batman), [])
+
+    def test_other_users_budgets_stay_hidden(self):
+        self.assertEqual(self.record_ids(), {self.home_record.id})
+        response = self.client.get(reverse("budget-detail", args=(self.vacation_budget.id,)))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.delete(reverse("budgetrecord-detail", args=(self.vacation_record.id,)))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(ACCESSIBLE_BUDGETS_CACHE_TTL=0)
+    def test_without_cache_owners_are_a_subquery(self):
+        self.assertEqual(self.record_ids(), {self.home_record.id})
+        self.vacation_budget.owners.add(self.batman)
+        self.assertEqual(self.record_ids(), {self.home_record.id, self.vacation_record.id})
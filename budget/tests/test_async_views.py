@@ -0,0 +1,78 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from budget.authentication import token_cache
+from budget.factory import BudgetFactory, ExpenseBudgetFactory, IncomeBudgetFactory
+from budget.tests.test_views import BaseTestCase
+
+
+class AsyncViewsTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.vacation_budget = BudgetFactory.create(name="vacation", owners=[self.batman, self.star_lord])
+        IncomeBudgetFactory.create_batch(3, budget=self.home_budget, category=self.work_category)
+        ExpenseBudgetFactory.create_batch(3, budget=self.vacation_budget, category=self.food_category)
+        BudgetFactory.create(name="other", owners=[self.star_lord])
+        self.authorize(self.batman)
+        self.async_client = AsyncClient()
+        self.authorization = self.client.defaults["HTTP_AUTHORIZATION"]
+
+    async def assertSameAsSync(self, async_url, sync_url, params=None):
+        async_response = await self.async_client.get(async_url, params or {}, AUTHORIZATION=self.authorization)
+        sync_response = await sync_to_async(self.client.get)(sync_url, params or {})
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        # pagination links point back at the endpoint that was called
+        data = json.loads(async_response.content.replace(b"/async/", b"/"))
+        self.assertEqual(data, json.loads(sync_response.content))
+        return data
+
+    async def test_budget_list(self):
+        data = await self.assertSameAsSync(reverse("async-budget-list"), reverse("budget-list"))
+        self.assertEqual(data["count"], 2)
+
+        await self.assertSameAsSync(reverse("async-budget-list"), reverse("budget-list"), {"records_preview": 2})
+        await self.assertSameAsSync(reverse("async-budget-list"), reverse("budget-list"), {"limit": 1, "offset": 1})
+
+    async def test_record_list(self):
+        url, sync_url = reverse("async-budgetrecord-list"), reverse("budgetrecord-list")
+        data = await self.assertSameAsSync(url, sync_url, {"budget": self.home_budget.id})
+        self.assertEqual(data["count"], 3)
+        await self.assertSameAsSync(url, sync_url, {"category": self.food_category.id})
+
+    async def test_record_list_cursor_pagination(self):
+        url, sync_url = reverse("async-budgetrecord-list"), reverse("budgetrecord-list")
+        first = await self.assertSameAsSync(url, sync_url, {"pagination": "cursor", "limit": 4})
+        self.assertEqual(len(first["results"]), 4)
+
+        cursor = parse_qs(urlparse(first["next"]).query)["cursor"][0]
+        second = await self.assertSameAsSync(url, sync_url, {"limit": 4, "cursor": cursor})
+        self.assertEqual(len(second["results"]), 2)
+
+    async def test_summaries(self):
+        url, sync_url = reverse("async-budget-summaries"), reverse("budget-summaries")
+        data = await self.assertSameAsSync(url, sync_url)
+        self.assertEqual(len(data), 2)
+        await self.assertSameAsSync(url, sync_url, {"budget": self.home_budget.id, "date_from": "2020-01-15"})
+        await self.assertSameAsSync(url, sync_url, {"date_from": "2020-01-15", "date_to": "2020-01-01"})
+        data = await self.assertSameAsSync(url, sync_url, {"budget": "abc"})
+        self.assertIn("budget", data)
+
+    async def test_authentication(self):
+        response = await self.async_client.get(reverse("async-budget-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], "Token")
+
+        response = await self.async_client.get(reverse("async-budget-list"), AUTHORIZATION="Token invalid")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        token = await Token.objects.aget(user=self.star_lord)
+        response = await self.async_client.get(reverse("async-budget-list"), AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(json.loads(response.content)["count"], 2)
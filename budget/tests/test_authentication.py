@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from budget.authentication import LocalTokenCache, token_cache
+from budget.tests.test_views import BaseTestCase
+
+
+class CachedTokenAuthenticationTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.authorize(self.batman)
+        self.url = reverse("budget-list")
+
+    def token_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        return response, [query for query in context.captured_queries if "authtoken_token" in query["sql"]]
+
+    def test_token_query_is_cached(self):
+        response, queries = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.wsgi_request.user, self.batman)
+
+    def test_deleted_token_is_rejected(self):
+        self.token_queries()
+        Token.objects.get(user=self.batman).delete()
+
+        response, _ = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_regenerated_token_replaces_old_one(self):
+        self.token_queries()
+        Token.objects.filter(user=self.batman).delete()
+        new_token = Token.objects.create(user=self.batman)
+
+        response, _ = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.authorize(self.batman)
+        self.assertEqual(self.client.get(self.url).wsgi_request.auth, new_token)
+
+    def test_deactivated_user_is_rejected(self):
+        self.token_queries()
+        self.batman.is_active = False
+        self.batman.save()
+
+        response, _ = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LocalTokenCacheTest(SimpleTestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = LocalTokenCache(max_size=2, ttl=60)
+        cache.set("a", ("user-a", "token-a"))
+        cache.set("b", ("user-b", "token-b"))
+        cache.get("a")
+        cache.set("c", ("user-c", "token-c"))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), ("user-a", "token-a"))
+        self.assertEqual(cache.get("c"), ("user-c", "token-c"))
+
+    def test_entries_expire(self):
+        cache = LocalTokenCache(max_size=2, ttl=60)
+        with mock.patch("budget.authentication.time.monotonic", return_value=100):
+            cache.set("a", ("user-a", "token-a"))
+        with mock.patch("budget.authentication.time.monotonic", return_value=161):
+            self.assertIsNone(cache.get("a"))
@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+
+from budget.benchmarks import compare, run_benchmarks, seed_options
+from budget.models import BudgetRecord
+from budget.tests.test_views import BaseTestCase
+from budget.views import BudgetRecordViewSet
+
+
+class BenchmarkTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        call_command("seed_db", "--users", 2, "--budgets-per-user", 2, "--records-per-budget", 10, "--prefix", "bench")
+        self.user = User.objects.get(username="bench_0000000")
+
+    def test_results_within_own_baseline(self):
+        results = run_benchmarks(self.user, iterations=3, warmup=1)
+
+        self.assertEqual(results["record-list"]["queries"], 3)
+        self.assertLessEqual(results["record-list"]["p50_ms"], results["record-list"]["p95_ms"])
+        self.assertEqual(compare(results, results), [])
+        self.assertEqual(BudgetRecord.objects.filter(budget__owners=self.user).count(), 20)
+
+    def test_unmeasured_rows_and_advisory_latency_are_not_checked(self):
+        results = {"record-list": {"p95_ms": 100.0, "queries": 3, "rows": None}}
+        baselines = {"record-list": {"p95_ms": 10.0, "queries": 3, "rows": 20}}
+        self.assertEqual(compare(results, baselines, latency_tolerance=None), [])
+        self.assertEqual(len(compare(results, baselines)), 1)
+        results["record-list"]["rows"] = 50
+        self.assertEqual(
+            compare(results, baselines, latency_tolerance=None), ["record-list: 50 rows fetched, baseline 20"]
+        )
+
+    def test_seeded_data_does_not_depend_on_the_day(self):
+        options = seed_options("1k", "bench")
+        self.assertIn("--until", options)
+
+    # the values() list path reads categories in the same query, N+1 needs the model serializers
+    @override_settings(VALUES_LIST_SERIALIZERS=False)
+    def test_n_plus_one_is_flagged(self):
+        baselines = run_benchmarks(self.user, iterations=1, warmup=0)
+        queryset = BudgetRecord.objects.order_by("-created_at", "-id")
+        with mock.patch.object(BudgetRecordViewSet, "queryset", queryset):
+            results = run_benchmarks(self.user, iterations=1, warmup=0)
+
+        regressions = compare(results, baselines, latency_tolerance=100)
+        self.assertTrue(any(regression.startswith("record-list:") for regression in regressions), regressions)
+        self.assertFalse(any(regression.startswith("budget-list:") for regression in regressions), regressions)
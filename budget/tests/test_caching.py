@@ -0,0 +1,99 @@
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework import status
+
+from budget.authentication import token_cache
+from budget.factory import BudgetFactory, ExpenseBudgetFactory, IncomeBudgetFactory
+from budget.tests.test_views import BaseTestCase
+
+
+class ConditionalGetTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        token_cache.clear()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.salary = IncomeBudgetFactory.create(budget=self.home_budget, category=self.work_category)
+        self.authorize(self.batman)
+        self.url = reverse("budget-list")
+
+    def get(self, url=None, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(url or self.url, **headers)
+
+    def assertChanged(self, etag, url=None):
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_unchanged_poll_is_not_modified(self):
+        etag = self.get()["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.get(etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertIn("Authorization", response["Vary"])
+
+    def test_unchanged_data_is_served_from_cache(self):
+        first = self.get()
+
+        with self.assertNumQueries(1):
+            second = self.get()
+        self.assertEqual(second.data, first.data)
+
+    def test_detail(self):
+        url = reverse("budget-detail", args=(self.home_budget.id,))
+        etag = self.get(url)["ETag"]
+        self.assertEqual(self.get(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.home_budget.name = "house"
+        self.home_budget.save()
+        self.assertChanged(etag, url)
+        self.assertEqual(self.get(url).data["name"], "house")
+
+    def test_record_changes_change_version(self):
+        etag = self.get()["ETag"]
+        expense = ExpenseBudgetFactory.create(budget=self.home_budget, category=self.food_category)
+        self.assertChanged(etag)
+
+        etag = self.get()["ETag"]
+        expense.delete()
+        self.assertChanged(etag)
+        self.assertEqual(self.get().data["results"][0]["records_count"], 1)
+
+    def test_owner_changes_change_version(self):
+        etag = self.get()["ETag"]
+        self.home_budget.owners.add(self.star_lord)
+        self.assertChanged(etag)
+
+        etag = self.get()["ETag"]
+        self.star_lord.budgets.clear()
+        self.assertChanged(etag)
+
+        etag = self.get()["ETag"]
+        self.home_budget.owners.remove(self.batman)
+        self.assertChanged(etag)
+        self.assertEqual(self.get().data["count"], 0)
+
+    def test_deleted_budget_changes_version(self):
+        other_budget = BudgetFactory.create(name="other", owners=[self.batman])
+        etag = self.get()["ETag"]
+        other_budget.delete()
+        self.assertChanged(etag)
+
+    def test_records_list(self):
+        url = reverse("budgetrecord-list")
+        etag = self.get(url)["ETag"]
+        self.assertEqual(self.get(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.salary.amount = 1
+        self.salary.save()
+        self.assertChanged(etag, url)
+
+    def test_other_users_budget_is_not_cached(self):
+        other_budget = BudgetFactory.create(name="other", owners=[self.star_lord])
+        url = reverse("budget-detail", args=(other_budget.id,))
+        response = self.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", response)
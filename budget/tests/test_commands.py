@@ -0,0 +1,130 @@
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from rest_framework.authtoken.models import Token
+
+from budget.factory import BudgetFactory
+from budget.models import Budget, BudgetCategory, BudgetRecord, BudgetTotal
+from budget.tests.test_views import BaseTestCase
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20230115120000[0:GMT]
+<TRNAMT>-12.50
+<NAME>food
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20230201<TRNAMT>2500.00<NAME>Salary from a very long employer name</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class ImportRecordsTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content)
+        return path
+
+    def test_import_csv(self):
+        path = self.write(
+            "records.csv",
+            "date,amount,category\n2023-01-15,-12.50,food\n2023-01-16T10:00:00Z,100,salary\n2023-02-01,-3,\n",
+        )
+        call_command("import_records", path, "--budget", self.home_budget.id, "--batch-size", 2)
+
+        records = self.home_budget.records.order_by("created_at")
+        self.assertEqual([record.amount for record in records], [Decimal("-12.50"), Decimal(100), Decimal(-3)])
+        self.assertEqual(records[0].created_at, datetime(2023, 1, 15, tzinfo=timezone.utc))
+        self.assertEqual(records[0].category, self.food_category)
+        self.assertEqual(records[1].category.name, "salary")
+        self.assertIsNone(records[2].category)
+        self.assertEqual(BudgetTotal.objects.verify(), [])
+
+    def test_import_exported_csv_columns(self):
+        path = self.write("records.csv", "id,created_at,amount,category_name\n7,2023-01-15T08:00:00Z,-1.00,work\n")
+        call_command("import_records", path, "--budget", self.home_budget.id)
+
+        self.assertEqual(self.home_budget.records.get().category, self.work_category)
+
+    def test_invalid_row_stops_after_committed_batches(self):
+        checkpoint = Path(self.directory.name) / "checkpoint"
+        path = self.write("records.csv", "date,amount\n2023-01-01,1\n2023-01-02,2\n2023-01-03,xxx\n2023-01-04,4\n")
+        with self.assertRaisesMessage(CommandError, "Row 3"):
+            call_command(
+                "import_records", path, "--budget", self.home_budget.id, "--batch-size", 2, "--checkpoint", checkpoint
+            )
+
+        self.assertEqual(self.home_budget.records.count(), 2)
+        self.assertEqual(checkpoint.read_text(), "2")
+
+        path.write_text("date,amount\n2023-01-01,1\n2023-01-02,2\n2023-01-03,3\n2023-01-04,4\n")
+        call_command(
+            "import_records", path, "--budget", self.home_budget.id, "--batch-size", 2, "--checkpoint", checkpoint
+        )
+
+        self.assertEqual(sorted(self.home_budget.records.values_list("amount", flat=True)), [1, 2, 3, 4])
+        self.assertEqual(checkpoint.read_text(), "4")
+
+    def test_import_ofx(self):
+        path = self.write("statement.ofx", OFX)
+        call_command("import_records", path, "--budget", self.home_budget.id)
+
+        records = self.home_budget.records.order_by("created_at")
+        self.assertEqual(
+            [(record.created_at.date().isoformat(), record.amount) for record in records],
+            [("2023-01-15", Decimal("-12.50")), ("2023-02-01", Decimal("2500"))],
+        )
+        self.assertEqual(records[0].category, self.food_category)
+        self.assertTrue(BudgetCategory.objects.filter(name="Salary from a very long employ").exists())
+
+    def test_unknown_budget(self):
+        path = self.write("records.csv", "date,amount\n2023-01-01,1\n")
+        with self.assertRaises(CommandError):
+            call_command("import_records", path, "--budget", 0)
+        self.assertFalse(BudgetRecord.objects.exists())
+
+
+class SeedDbTest(BaseTestCase):
+    def seed(self, prefix, *args):
+        options = ("--users", 4, "--budgets-per-user", 2, "--records-per-budget", 5, "--categories", 3)
+        call_command("seed_db", *options, "--until", "2023-06-01", "--prefix", prefix, *args)
+        return BudgetRecord.objects.filter(budget__owners__username__startswith=prefix).distinct()
+
+    def test_generated_data_set(self):
+        records = self.seed("load", "--shared-ratio", 1, "--batch-size", 7)
+
+        budgets = Budget.objects.filter(owners__username__startswith="load_").distinct()
+        self.assertEqual(budgets.count(), 8)
+        self.assertTrue(all(budget.owners.count() == 2 for budget in budgets))
+        self.assertEqual(Token.objects.filter(user__username__startswith="load_").count(), 4)
+        self.assertEqual(records.count(), 40)
+        self.assertTrue(all(record.created_at.year in (2021, 2022, 2023) for record in records))
+        self.assertEqual(BudgetTotal.objects.verify(), [])
+
+    def test_same_seed_generates_same_records(self):
+        def rows(records):
+            return list(records.order_by("id").values_list("created_at", "amount", "category__name"))
+
+        def owners(prefix):
+            pairs = Budget.owners.through.objects.filter(user__username__startswith=prefix)
+            pairs = pairs.order_by("budget_id", "user__username").values_list("budget_id", "user__username")
+            budget_ids = sorted({budget_id for budget_id, _ in pairs})
+            return [(budget_ids.index(budget_id), username[len(prefix) :]) for budget_id, username in pairs]
+
+        first = rows(self.seed("first", "--seed", 3, "--shared-ratio", 0.5))
+        self.assertEqual(rows(self.seed("second", "--seed", 3, "--shared-ratio", 0.5)), first)
+        self.assertNotEqual(rows(self.seed("third", "--seed", 4, "--shared-ratio", 0.5)), first)
+
+        self.assertEqual(owners("second_"), owners("first_"))
+        # 8 budgets, some shared with a second user
+        self.assertGreater(len(owners("first_")), 8)
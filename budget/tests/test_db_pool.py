@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from budget.backends.postgresql_pool.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_released_connection_is_reused(self):
+        pool = ConnectionPool(max_size=2)
+        connection, reused = pool.acquire(FakeConnection)
+        self.assertFalse(reused)
+        pool.release(connection)
+
+        self.assertEqual(pool.acquire(FakeConnection), (connection, True))
+        self.assertEqual(pool.opened, 1)
+
+    def test_acquire_waits_for_a_free_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        with self.assertRaises(ConnectionError):
+            pool.acquire(mock.Mock(side_effect=ConnectionError))
+
+        connection, _ = pool.acquire(FakeConnection)
+        self.assertIsInstance(connection, FakeConnection)
+
+    def test_discarded_and_closed_connections_are_not_reused(self):
+        pool = ConnectionPool(max_size=2)
+        discarded, _ = pool.acquire(FakeConnection)
+        broken, _ = pool.acquire(FakeConnection)
+        pool.release(discarded, discard=True)
+        broken.closed = True
+        pool.release(broken)
+
+        self.assertTrue(discarded.closed)
+        self.assertEqual(pool.idle, 0)
+        self.assertFalse(pool.acquire(FakeConnection)[1])
+
+    def test_failed_check_closes_the_idle_connection(self):
+        pool = ConnectionPool(max_size=1)
+        connection, _ = pool.acquire(FakeConnection)
+        pool.release(connection)
+
+        new_connection, reused = pool.acquire(FakeConnection, check=lambda connection: False)
+        self.assertFalse(reused)
+        self.assertIsNot(new_connection, connection)
+        self.assertTrue(connection.closed)
+
+    def test_idle_connections_expire(self):
+        pool = ConnectionPool(max_size=1, max_idle=60)
+        connection, _ = pool.acquire(FakeConnection)
+        with mock.patch("budget.backends.postgresql_pool.pool.time.monotonic", return_value=100):
+            pool.release(connection)
+        with mock.patch("budget.backends.postgresql_pool.pool.time.monotonic", return_value=161):
+            self.assertFalse(pool.acquire(FakeConnection)[1])
+        self.assertTrue(connection.closed)
@@ -0,0 +1,53 @@
+import json
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from budget.factory import BudgetFactory, ExpenseBudgetFactory
+from budget.models import BudgetRecord
+from budget.tests.test_views import BaseTestCase
+from budget.views import BudgetRecordViewSet
+
+
+@override_settings(REQUEST_INSTRUMENTATION=True, REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD=3)
+class QueryInstrumentationMiddlewareTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        ExpenseBudgetFactory.create_batch(5, budget=self.home_budget, category=self.food_category)
+        self.authorize(self.batman)
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs("budget.middleware", level="INFO") as logs:
+            response = self.client.get(reverse("budgetrecord-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("serializer;dur=", timing)
+        self.assertIn(f'size;desc="{len(response.content)} bytes"', timing)
+
+        self.assertEqual(len(logs.records), 1)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["path"], reverse("budgetrecord-list"))
+        self.assertEqual(line["response_bytes"], len(response.content))
+        self.assertGreater(line["queries"], 0)
+
+    @override_settings(VALUES_LIST_SERIALIZERS=False)
+    def test_n_plus_one_is_logged(self):
+        queryset = BudgetRecord.objects.order_by("-created_at", "-id")
+        with mock.patch.object(BudgetRecordViewSet, "queryset", queryset), self.assertLogs("budget.middleware") as logs:
+            self.client.get(reverse("budgetrecord-list"))
+
+        warning = next(record for record in logs.records if record.levelname == "WARNING")
+        duplicates = json.loads(warning.getMessage())["duplicates"]
+        self.assertEqual(duplicates[0]["count"], 5)
+        self.assertIn("budget_budgetcategory", duplicates[0]["sql"])
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_disabled_by_default(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budgetrecord-list"))
+        self.assertNotIn("Server-Timing", response)
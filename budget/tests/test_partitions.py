@@ -0,0 +1,200 @@
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import skipIf, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from budget import partitions
+from budget.factory import BudgetFactory
+from budget.models import BudgetRecord, BudgetTotal
+from budget.tests.test_views import BaseTestCase
+
+
+def local_datetime(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class MonthsTest(SimpleTestCase):
+    def test_add_months(self):
+        self.assertEqual(partitions.add_months(date(2022, 11, 1), 3), date(2023, 2, 1))
+        self.assertEqual(partitions.add_months(date(2022, 1, 1), -1), date(2021, 12, 1))
+
+    def test_months_between(self):
+        months = list(partitions.months_between(date(2022, 11, 15), date(2023, 1, 1)))
+        self.assertEqual(months, [date(2022, 11, 1), date(2022, 12, 1), date(2023, 1, 1)])
+
+    def test_partition_name(self):
+        self.assertEqual(partitions.partition_name(date(2023, 2, 1)), "budget_budgetrecord_p2023_02")
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)
+class RecordDateRangeTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.january = BudgetRecord.objects.create(
+            budget=self.home_budget, amount=Decimal("-10.00"), created_at=local_datetime(2022, 1, 31, 23, 59)
+        )
+        self.february = BudgetRecord.objects.create(
+            budget=self.home_budget, amount=Decimal("-20.00"), created_at=local_datetime(2022, 2, 1)
+        )
+        self.march = BudgetRecord.objects.create(
+            budget=self.home_budget, amount=Decimal("-30.00"), created_at=local_datetime(2022, 3, 1)
+        )
+        self.authorize(self.batman)
+
+    def record_ids(self, params):
+        response = self.client.get(reverse("budgetrecord-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [record["id"] for record in response.data["results"]]
+
+    def test_inclusive_date_range(self):
+        self.assertEqual(self.record_ids({"date_from": "2022-02-01", "date_to": "2022-02-28"}), [self.february.id])
+        self.assertEqual(self.record_ids({"date_to": "2022-01-31"}), [self.january.id])
+        self.assertEqual(self.record_ids({"date_from": "2022-02-01"}), [self.march.id, self.february.id])
+
+    def test_cursor_pages_keep_the_range(self):
+        params = {"date_from": "2022-01-01", "date_to": "2022-02-28", "pagination": "cursor", "limit": 1}
+        first_page = self.client.get(reverse("budgetrecord-list"), params)
+        self.assertEqual([record["id"] for record in first_page.data["results"]], [self.february.id])
+        second_page = self.client.get(first_page.data["next"])
+        self.assertEqual([record["id"] for record in second_page.data["results"]], [self.january.id])
+        self.assertIsNone(second_page.data["next"])
+
+    def test_invalid_range(self):
+        response = self.client.get(reverse("budgetrecord-list"), {"date_from": "2022-02-01", "date_to": "2022-01-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse("budgetrecord-list"), {"date_from": "February"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_ignores_the_range(self):
+        url = reverse("budgetrecord-detail", args=(self.january.id,))
+        response = self.client.get(url, {"date_from": "2022-02-01"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@skipIf(connection.vendor == "postgresql", "PostgreSQL supports partitions")
+class ManagePartitionsUnsupportedTest(SimpleTestCase):
+    def test_needs_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "PostgreSQL"):
+            call_command("manage_partitions")
+
+
+@skipUnless(connection.vendor == "postgresql", "partitions are PostgreSQL only")
+@override_settings(RESPONSE_CACHE_TTL=0)
+class PartitionedRecordsTest(BaseTestCase):
+    """The record table partitioned in the test transaction, unless RECORD_PARTITIONS already did it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        if not partitions.is_partitioned(connection):
+            partitions.partition_table(connection, ahead=1)
+        cls.this_month = partitions.current_month()
+        cls.next_month = partitions.add_months(cls.this_month, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.authorize(self.batman)
+
+    def partition_of(self, record):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT tableoid::regclass::text FROM "{partitions.TABLE}" WHERE id = %s', [record.id])
+            return cursor.fetchone()[0]
+
+    def create_record(self, month, amount="-10.00"):
+        created_at = timezone.make_aware(datetime.combine(month.replace(day=15), datetime.min.time()))
+        return BudgetRecord.objects.create(
+            budget=self.home_budget, category=self.food_category, amount=Decimal(amount), created_at=created_at
+        )
+
+    def test_records_go_to_their_month(self):
+        record = self.create_record(self.this_month)
+        self.assertEqual(self.partition_of(record), partitions.partition_name(self.this_month))
+        far_away = self.create_record(partitions.add_months(self.this_month, 120))
+        self.assertEqual(self.partition_of(far_away), partitions.DEFAULT_PARTITION)
+        self.assertEqual(BudgetRecord.objects.get(pk=far_away.pk), far_away)
+
+    def test_bulk_create_returns_ids(self):
+        records = BudgetRecord.objects.bulk_create(
+            [BudgetRecord(budget=self.home_budget, amount=Decimal("1.00")) for _ in range(3)]
+        )
+        self.assertEqual(set(BudgetRecord.objects.values_list("id", flat=True)), {record.id for record in records})
+
+    def test_update_moves_the_record_between_partitions(self):
+        record = self.create_record(self.this_month)
+        record.amount = Decimal("-15.00")
+        record.created_at = record.created_at.replace(month=self.next_month.month, year=self.next_month.year)
+        record.save()
+
+        self.assertEqual(self.partition_of(record), partitions.partition_name(self.next_month))
+        self.assertEqual(BudgetRecord.objects.get(pk=record.pk).amount, Decimal("-15.00"))
+        self.assertEqual(BudgetTotal.objects.verify(), [])
+
+    def test_api_update_and_delete(self):
+        record = self.create_record(self.this_month)
+        url = reverse("budgetrecord-detail", args=(record.id,))
+        response = self.client.patch(url, {"amount": "-12.34"}, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(BudgetRecord.objects.filter(pk=record.pk).exists())
+        self.assertEqual(BudgetTotal.objects.verify(), [])
+
+    def test_budget_delete_cascades_to_all_partitions(self):
+        for month in (self.this_month, self.next_month, partitions.add_months(self.this_month, 120)):
+            self.create_record(month)
+        self.home_budget.delete()
+        self.assertFalse(BudgetRecord.objects.exists())
+        self.assertFalse(BudgetTotal.objects.exists())
+
+    def test_new_partitions_take_over_default_rows(self):
+        month = partitions.add_months(self.this_month, 4)
+        record = self.create_record(month)
+        self.assertEqual(self.partition_of(record), partitions.DEFAULT_PARTITION)
+        # fire the deferred foreign key checks, pending trigger events block ALTER TABLE
+        connection.check_constraints()
+
+        created = partitions.create_partitions(connection, month)
+        self.assertIn(partitions.partition_name(month), created)
+        self.assertEqual(self.partition_of(record), partitions.partition_name(month))
+        self.assertEqual(partitions.create_partitions(connection, month), [])
+
+    def test_detached_months_leave_the_table(self):
+        self.create_record(self.this_month)
+        current = self.create_record(self.next_month)
+        connection.check_constraints()
+        detached = partitions.detach_partitions(connection, self.next_month)
+        self.assertIn(partitions.partition_name(self.this_month), detached)
+        self.assertEqual(list(BudgetRecord.objects.values_list("id", flat=True)), [current.id])
+        records = self.client.get(reverse("budgetrecord-list")).data["results"]
+        self.assertEqual([record["id"] for record in records], [current.id])
+        self.assertEqual(BudgetTotal.objects.verify(), [])
+
+        # the detached table no longer points at the budget
+        self.home_budget.delete()
+        connection.check_constraints()
+        self.assertEqual(BudgetTotal.objects.verify(), [])
+
+    def test_date_range_is_pruned_to_its_months(self):
+        self.create_record(self.this_month)
+        last_day = partitions.add_months(self.this_month, 1).toordinal() - 1
+        params = {"date_from": self.this_month.isoformat(), "date_to": date.fromordinal(last_day).isoformat()}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("budgetrecord-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = next(
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(f'SELECT "{partitions.TABLE}"') and "LIMIT" in query["sql"]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn(partitions.partition_name(self.this_month), plan)
+        self.assertNotIn(partitions.partition_name(self.next_month), plan)
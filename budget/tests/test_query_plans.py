@@ -0,0 +1,142 @@
+"""
+EXPLAIN checks for the hot list queries.
+
+Each test sends a real request, takes the SQL the view executed and asks
+PostgreSQL for its plan with ``enable_seqscan`` turned off. Test tables hold a
+handful of rows, so the planner would otherwise always prefer a sequential
+scan; disabling it shows whether an index *can* serve the query, which is what
+breaks when a filter or ordering change stops matching the indexes.
+"""
+from itertools import combinations
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from budget.factory import BudgetFactory, ExpenseBudgetFactory, IncomeBudgetFactory
+from budget.models import BudgetCategory, BudgetRecord
+from budget.serializers import RECORD_ORDERINGS
+from budget.tests.test_views import BaseTestCase
+
+
+@skipUnless(connection.vendor == "postgresql", "query plans are checked on PostgreSQL only")
+class QueryPlanTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        IncomeBudgetFactory.create_batch(5, budget=self.home_budget, category=self.work_category)
+        ExpenseBudgetFactory.create_batch(5, budget=self.home_budget, category=self.food_category)
+        self.authorize(self.batman)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def page_query(self, url, params, table):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return next(
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(f'SELECT "{table}"') and "LIMIT" in query["sql"]
+        )
+
+    def assertUsesIndex(self, sql, index_name):
+        plan = self.explain(sql)
+        self.assertIn(index_name, plan, f"{index_name} is not used by:\n{sql}\n{plan}")
+
+    def test_records_by_budget(self):
+        sql = self.page_query(reverse("budgetrecord-list"), {"budget": self.home_budget.id}, "budget_budgetrecord")
+        self.assertUsesIndex(sql, "record_budget_created_idx")
+
+    def test_records_by_budget_cursor_page(self):
+        first_page = self.client.get(
+            reverse("budgetrecord-list"), {"budget": self.home_budget.id, "pagination": "cursor", "limit": 3}
+        )
+        sql = self.page_query(first_page.data["next"], {}, "budget_budgetrecord")
+        self.assertUsesIndex(sql, "record_budget_created_idx")
+
+    def test_records_by_category(self):
+        sql = self.page_query(reverse("budgetrecord-list"), {"category": self.food_category.id}, "budget_budgetrecord")
+        self.assertUsesIndex(sql, "record_category_budget_idx")
+
+    def test_records_by_budget_and_date_range(self):
+        params = {"budget": self.home_budget.id, "date_from": "2022-03-01", "date_to": "2022-03-31"}
+        sql = self.page_query(reverse("budgetrecord-list"), params, "budget_budgetrecord")
+        self.assertUsesIndex(sql, "record_budget_created_idx")
+
+    def test_records_by_budget_ordered_by_amount(self):
+        params = {"budget": self.home_budget.id, "type": "expense", "ordering": "-amount"}
+        sql = self.page_query(reverse("budgetrecord-list"), params, "budget_budgetrecord")
+        self.assertUsesIndex(sql, "record_budget_amount_idx")
+
+    def test_records_by_budget_and_amount_range_cursor_page(self):
+        params = {"budget": self.home_budget.id, "amount_min": "-50", "amount_max": "50", "ordering": "amount"}
+        first_page = self.client.get(reverse("budgetrecord-list"), {**params, "pagination": "cursor", "limit": 3})
+        sql = self.page_query(first_page.data["next"], {}, "budget_budgetrecord")
+        self.assertUsesIndex(sql, "record_budget_amount_idx")
+
+    @staticmethod
+    def record_index_for(filters, ordering):
+        """The index the README promises for a combination of /records filters and an ordering."""
+        if "category" in filters:
+            return "record_category_budget_idx"
+        if "amount" in ordering or {"type", "amount range"} & set(filters):
+            return "record_budget_amount_idx"
+        return "record_budget_created_idx"
+
+    def explain_with_only(self, sql, index_name):
+        """
+        The plan with every other record index dropped, in a savepoint that is rolled
+        back. With ``budget_id IN (...)`` always in the query, any index leading with
+        the budget could serve it, so the planner's pick among them proves little;
+        alone, the promised index has to serve the query or the plan falls back to a
+        sequential or primary key scan.
+        """
+        others = [index.name for index in BudgetRecord._meta.indexes if index.name != index_name]
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for other in others:
+                    cursor.execute(f'DROP INDEX "{other}"')
+            plan = self.explain(sql)
+            transaction.set_rollback(True)
+        return plan
+
+    def test_every_record_filter_combination_uses_its_index(self):
+        filters = {
+            "budget": {"budget": self.home_budget.id},
+            "category": {"category": self.food_category.id},
+            "date range": {"date_from": "2022-03-01", "date_to": "2022-03-31"},
+            "type": {"type": "income"},
+            "amount range": {"amount_min": "-50", "amount_max": "50"},
+        }
+        for size in range(len(filters) + 1):
+            for names in combinations(filters, size):
+                for ordering in RECORD_ORDERINGS:
+                    params = {"ordering": ordering}
+                    for name in names:
+                        params.update(filters[name])
+                    index_name = self.record_index_for(names, ordering)
+                    with self.subTest(filters=names, ordering=ordering, index=index_name):
+                        sql = self.page_query(reverse("budgetrecord-list"), params, "budget_budgetrecord")
+                        plan = self.explain_with_only(sql, index_name)
+                        self.assertIn(index_name, plan, f"{index_name} does not serve:\n{sql}\n{plan}")
+                        self.assertNotIn("Seq Scan on budget_budgetrecord", plan)
+
+    def test_budgets_by_accessible_ids(self):
+        # the cached ids of the user's budgets replace the join on the owners table
+        sql = self.page_query(reverse("budget-list"), {}, "budget_budget")
+        self.assertNotIn("budget_budget_owners", sql)
+        self.assertIn('"budget_budget"."id" IN (', sql)
+        self.assertUsesIndex(sql, "budget_budget_pkey")
+
+    def test_category_by_name(self):
+        with CaptureQueriesContext(connection) as context:
+            list(BudgetCategory.objects.filter(name__in=["food", "work"]))
+        sql = context.captured_queries[0]["sql"]
+        self.assertUsesIndex(sql, "budget_budgetcategory_name_")
@@ -0,0 +1,96 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from budget.factory import BudgetFactory
+from budget.models import BudgetRecord
+from budget.tests.test_views import BaseTestCase
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)
+class RecordFiltersTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.vacation_budget = BudgetFactory.create(name="vacation", owners=[self.batman])
+
+        def record(budget, category, amount, day):
+            created_at = timezone.make_aware(datetime(2022, 3, day))
+            return BudgetRecord.objects.create(
+                budget=budget, category=category, amount=Decimal(amount), created_at=created_at
+            )
+
+        self.salary = record(self.home_budget, self.work_category, "1500.00", 1)
+        self.groceries = record(self.home_budget, self.food_category, "-45.50", 2)
+        self.dinner = record(self.vacation_budget, self.food_category, "-120.00", 3)
+        self.taxi = record(self.vacation_budget, self.transport_category, "-45.50", 4)
+        self.refund = record(self.vacation_budget, self.transport_category, "45.50", 5)
+        self.authorize(self.batman)
+
+    def get_records(self, params):
+        response = self.client.get(reverse("budgetrecord-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [record["id"] for record in response.data["results"]]
+
+    def test_budget_and_category_both_match(self):
+        params = {"budget": self.vacation_budget.id, "category": self.food_category.id}
+        self.assertEqual(self.get_records(params), [self.dinner.id])
+        params["category"] = [self.food_category.id, self.transport_category.id]
+        self.assertEqual(self.get_records(params), [self.refund.id, self.taxi.id, self.dinner.id])
+
+    def test_amount_sign(self):
+        self.assertEqual(self.get_records({"type": "income"}), [self.refund.id, self.salary.id])
+        self.assertEqual(
+            self.get_records({"type": "expense", "budget": self.vacation_budget.id}), [self.taxi.id, self.dinner.id]
+        )
+
+    def test_amount_range(self):
+        params = {"amount_min": "-100", "amount_max": "45.50"}
+        self.assertEqual(self.get_records(params), [self.refund.id, self.taxi.id, self.groceries.id])
+        params = {"amount_min": "-100", "type": "expense", "date_from": "2022-03-03"}
+        self.assertEqual(self.get_records(params), [self.taxi.id])
+
+    def test_ordering(self):
+        self.assertEqual(
+            self.get_records({"ordering": "amount"}),
+            [self.dinner.id, self.groceries.id, self.taxi.id, self.refund.id, self.salary.id],
+        )
+        self.assertEqual(
+            self.get_records({"ordering": "created_at", "type": "income"}), [self.salary.id, self.refund.id]
+        )
+        self.assertEqual(self.get_records({"ordering": "-amount", "limit": 2}), [self.salary.id, self.refund.id])
+
+    def test_cursor_pages_follow_the_ordering(self):
+        params = {"ordering": "-amount", "type": "expense", "pagination": "cursor", "limit": 1}
+        response = self.client.get(reverse("budgetrecord-list"), params)
+        pages = [[record["id"] for record in response.data["results"]]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            pages.append([record["id"] for record in response.data["results"]])
+        # the two -45.50 expenses are told apart by id
+        self.assertEqual(pages, [[self.taxi.id], [self.groceries.id], [self.dinner.id]])
+
+        previous = self.client.get(self.client.get(response.data["previous"]).data["previous"])
+        self.assertEqual([record["id"] for record in previous.data["results"]], [self.taxi.id])
+
+    def test_invalid_filters(self):
+        for params in (
+            {"category": "food"},
+            {"budget": "home"},
+            {"type": "refund"},
+            {"amount_min": "cheap"},
+            {"amount_min": "10", "amount_max": "-10"},
+            {"ordering": "category"},
+        ):
+            response = self.client.get(reverse("budgetrecord-list"), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_series_and_export_use_the_filters(self):
+        response = self.client.get(reverse("budgetrecord-series"), {"type": "expense", "bucket": "month"})
+        self.assertEqual(response.data["results"][0]["records_count"], 3)
+        response = self.client.get(reverse("budgetrecord-export"), {"export_format": "ndjson", "amount_min": "1000"})
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 1)
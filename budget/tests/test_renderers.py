@@ -0,0 +1,100 @@
+import io
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.renderers import JSONRenderer
+
+from budget.factory import BudgetFactory, ExpenseBudgetFactory, IncomeBudgetFactory
+from budget.renderers import FastJSONParser, FastJSONRenderer
+from budget.tests.test_views import BaseTestCase
+
+PAYLOAD = OrderedDict(
+    [
+        ("count", 2),
+        ("next", None),
+        (
+            "results",
+            [
+                {
+                    "id": 1,
+                    "amount": "-25.05",
+                    "total": Decimal("1234.50"),
+                    "category": {"id": 3, "name": "food – café \u2028\u2029"},
+                    "created_at": datetime(2022, 11, 5, 10, 30, 15, 123456, tzinfo=timezone.utc),
+                    "updated_at": datetime(2022, 11, 5, 10, 30, tzinfo=timezone(timedelta(hours=2))),
+                    "naive": datetime(2022, 11, 5),
+                    "day": date(2022, 11, 5),
+                    "ratio": 0.1,
+                    "active": True,
+                },
+                {
+                    "uuid": uuid.UUID(int=1),
+                    5: "int key",
+                    "error": ErrorDetail("Invalid."),
+                    "lazy": gettext_lazy("lazy"),
+                },
+            ],
+        ),
+    ]
+)
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def test_output_is_identical_to_drf(self):
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+
+    def test_indented_output_falls_back_to_drf(self):
+        media_type = "application/json; indent=4"
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD, media_type), JSONRenderer().render(PAYLOAD, media_type))
+
+    def test_works_without_orjson(self):
+        with mock.patch("budget.renderers.orjson", None):
+            self.assertEqual(FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+class FastJSONParserTest(SimpleTestCase):
+    def test_parses_what_the_renderer_rendered(self):
+        data = {"amount": "-25.05", "budget": 1, "items": [1.5, None, "\u2028"]}
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(FastJSONRenderer().render(data))), data)
+
+    def test_invalid_json_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"amount": '))
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"amount": NaN}'))
+
+    def test_other_encodings_fall_back_to_drf(self):
+        stream = io.BytesIO('{"name": "café"}'.encode("utf-16"))
+        self.assertEqual(FastJSONParser().parse(stream, parser_context={"encoding": "utf-16"}), {"name": "café"})
+
+
+class FastJSONResponseTest(BaseTestCase):
+    def test_responses_match_drf_rendering(self):
+        budget = BudgetFactory.create(name="home", owners=[self.batman])
+        IncomeBudgetFactory.create_batch(3, budget=budget, category=self.work_category)
+        ExpenseBudgetFactory.create_batch(3, budget=budget, category=self.food_category)
+        self.authorize(self.batman)
+
+        for url in (reverse("budgetrecord-list"), reverse("budget-list") + "?expand=records"):
+            response = self.client.get(url)
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_json_body_is_parsed(self):
+        budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.authorize(self.batman)
+
+        response = self.client.post(
+            reverse("budgetrecord-list"), {"amount": "-12.34", "budget": budget.id}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["amount"], "-12.34")
@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from budget.factory import BudgetFactory
+from budget.models import Budget, BudgetRecord
+from budget.routers import DEFAULT_DB, ReplicaRouter, read_db, read_db_for, stick_to_primary
+from budget.tests.test_views import BaseTestCase
+
+REPLICAS = ["replica_0", "replica_1"]
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.router = ReplicaRouter()
+
+    def test_reads_follow_the_request_read_db(self):
+        self.assertIsNone(self.router.db_for_read(Budget))
+        token = read_db.set("replica_1")
+        try:
+            self.assertEqual(self.router.db_for_read(Budget), "replica_1")
+            self.assertEqual(self.router.db_for_write(Budget), DEFAULT_DB)
+        finally:
+            read_db.reset(token)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica_0", "budget"))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB, "budget"))
+
+    def test_objects_from_replicas_and_primary_can_be_related(self):
+        budget, record = Budget(), BudgetRecord()
+        budget._state.db, record._state.db = "replica_0", DEFAULT_DB
+        self.assertTrue(self.router.allow_relation(budget, record))
+
+    def test_writer_sticks_to_primary(self):
+        user = User(pk=1)
+        self.assertIn(read_db_for(user), REPLICAS)
+        stick_to_primary(user)
+        self.assertEqual(read_db_for(user), DEFAULT_DB)
+        self.assertIn(read_db_for(User(pk=2)), REPLICAS)
+        self.assertIn(read_db_for(AnonymousUser()), REPLICAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_reads_from_primary(self):
+        self.assertEqual(read_db_for(User(pk=1)), DEFAULT_DB)
+
+
+# the test settings have no replica databases, so the queries themselves stay on the primary
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+@mock.patch.object(ReplicaRouter, "db_for_read", return_value=None)
+class ReplicaReadMixinTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.authorize(self.batman)
+
+    def read_db_of(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.renderer_context["view"].read_db
+
+    def test_reads_go_to_replica(self, db_for_read):
+        self.assertEqual(self.read_db_of(self.client.get(reverse("budget-list"))), "replica_0")
+        self.assertEqual(self.read_db_of(self.client.get(reverse("budgetrecord-list"))), "replica_0")
+        self.assertEqual(self.read_db_of(self.client.get(reverse("budget-summaries"))), "replica_0")
+        self.assertIsNone(read_db.get())
+
+    def test_reads_after_a_write_go_to_primary(self, db_for_read):
+        response = self.client.post(
+            reverse("budgetrecord-list"), {"amount": "-5.00", "budget": self.budget.id}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(reverse("budgetrecord-list"))
+        self.assertEqual(self.read_db_of(response), DEFAULT_DB)
+        self.assertEqual(response.data["count"], 1)
+        # other users are not affected by the write
+        self.authorize(self.star_lord)
+        self.assertEqual(self.read_db_of(self.client.get(reverse("budget-list"))), "replica_0")
+
+    def test_stickiness_expires(self, db_for_read):
+        stick_to_primary(self.batman)
+        self.assertEqual(self.read_db_of(self.client.get(reverse("budget-list"))), DEFAULT_DB)
+        caches["default"].clear()
+        self.assertEqual(self.read_db_of(self.client.get(reverse("budget-list"))), "replica_0")
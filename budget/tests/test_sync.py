@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+
+from budget.factory import BudgetFactory, ExpenseBudgetFactory, IncomeBudgetFactory
+from budget.models import BudgetCategory, SyncEvent
+from budget.tests.test_views import BaseTestCase
+
+
+@override_settings(SYNC_SAFETY_LAG=0)
+class SyncTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.salary = IncomeBudgetFactory.create(budget=self.home_budget, category=self.work_category)
+        self.fruits = ExpenseBudgetFactory.create(budget=self.home_budget, category=self.food_category)
+        self.vacation_budget = BudgetFactory.create(name="vacation", owners=[self.star_lord])
+        self.hotel = ExpenseBudgetFactory.create(budget=self.vacation_budget, category=self.transport_category)
+        self.authorize(self.batman)
+
+    def sync(self, since=None, **params):
+        if since:
+            params["since"] = since.isoformat()
+        response = self.client.get(reverse("sync"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    @staticmethod
+    def ids(rows):
+        return [row["id"] for row in rows]
+
+    def test_full_sync(self):
+        data = self.sync()
+
+        self.assertEqual(self.ids(data["budgets"]), [self.home_budget.id])
+        self.assertEqual(self.ids(data["records"]), [self.salary.id, self.fruits.id])
+        self.assertEqual(self.ids(data["categories"]), sorted([self.work_category.id, self.food_category.id]))
+        self.assertEqual(data["deleted"], {"budgets": [], "records": []})
+        self.assertIsNotNone(data["watermark"])
+
+    def test_only_changes_since_are_returned(self):
+        since = timezone.now()
+        self.fruits.amount = -1
+        self.fruits.save()
+
+        data = self.sync(since)
+        self.assertEqual(data["budgets"], [])
+        self.assertEqual(self.ids(data["records"]), [self.fruits.id])
+        self.assertEqual(self.ids(data["categories"]), [self.food_category.id])
+
+    def test_deletes_are_returned_as_tombstones(self):
+        since = timezone.now()
+        fruits_id = self.fruits.id
+        self.fruits.delete()
+
+        data = self.sync(since)
+        self.assertEqual(data["deleted"], {"budgets": [], "records": [fruits_id]})
+
+        home_budget_id = self.home_budget.id
+        self.home_budget.delete()
+        self.assertEqual(self.sync(since)["deleted"]["budgets"], [home_budget_id])
+
+    def test_shared_budget_brings_its_records(self):
+        since = timezone.now()
+        self.vacation_budget.owners.add(self.batman)
+
+        data = self.sync(since)
+        self.assertEqual(self.ids(data["budgets"]), [self.vacation_budget.id])
+        self.assertEqual(self.ids(data["records"]), [self.hotel.id])
+
+        self.batman.budgets.remove(self.vacation_budget)
+        data = self.sync(since)
+        self.assertEqual(data["budgets"], [])
+        self.assertEqual(data["deleted"]["budgets"], [self.vacation_budget.id])
+
+    def test_record_moved_to_other_budget(self):
+        since = timezone.now()
+        self.fruits.budget = self.vacation_budget
+        self.fruits.save()
+
+        self.assertEqual(self.sync(since)["deleted"]["records"], [self.fruits.id])
+        self.authorize(self.star_lord)
+        self.assertIn(self.fruits.id, self.ids(self.sync(since)["records"]))
+
+    def test_renamed_category(self):
+        since = timezone.now()
+        BudgetCategory.objects.filter(id=self.work_category.id).update(name="job", updated_at=timezone.now())
+        self.transport_category.save()
+
+        self.assertEqual(self.ids(self.sync(since)["categories"]), [self.work_category.id])
+
+    @override_settings(SYNC_SAFETY_LAG=60)
+    def test_watermark_lags_behind(self):
+        before = timezone.now()
+        watermark = parse_datetime(self.sync(before - timedelta(hours=1))["watermark"])
+        self.assertLessEqual(watermark, timezone.now() - timedelta(seconds=60))
+        self.assertGreaterEqual(watermark, before - timedelta(seconds=60))
+
+        self.assertEqual(parse_datetime(self.sync(before)["watermark"]), before)
+
+    def test_records_come_in_pages(self):
+        since = timezone.now()
+        self.salary.save()
+        self.fruits.save()
+        self.vacation_budget.owners.add(self.batman)
+
+        data = self.sync(since, limit=1)
+        watermark = data["watermark"]
+        pages = [data]
+        while data["next"]:
+            data = self.client.get(data["next"]).data
+            pages.append(data)
+        self.assertEqual(
+            [self.ids(page["records"]) for page in pages], [[self.hotel.id], [self.salary.id], [self.fruits.id]]
+        )
+        # budgets come once, the watermark of the first page holds for the whole sync
+        self.assertEqual([self.ids(page["budgets"]) for page in pages], [[self.vacation_budget.id], [], []])
+        self.assertEqual({page["watermark"] for page in pages}, {watermark})
+        self.assertEqual(self.ids(pages[1]["categories"]), [self.work_category.id])
+
+    @override_settings(SYNC_EVENT_RETENTION_DAYS=7)
+    def test_since_older_than_the_log_needs_a_resync(self):
+        response = self.client.get(reverse("sync"), {"since": (timezone.now() - timedelta(days=8)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(response.data["detail"].code, "resync_needed")
+        self.sync(timezone.now() - timedelta(days=6))
+
+    @override_settings(SYNC_EVENT_RETENTION_DAYS=7)
+    def test_old_events_are_pruned(self):
+        fruits_id, salary_id = self.fruits.id, self.salary.id
+        self.fruits.delete()
+        self.salary.delete()
+        SyncEvent.objects.filter(object_id=fruits_id).update(created_at=timezone.now() - timedelta(days=8))
+        call_command("prune_sync_events")
+        records = SyncEvent.objects.filter(model="record")
+        self.assertEqual(list(records.values_list("object_id", flat=True)), [salary_id])
+
+    def test_invalid_since(self):
+        response = self.client.get(reverse("sync"), {"since": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
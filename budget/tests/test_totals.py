@@ -0,0 +1,88 @@
+import json
+from decimal import Decimal
+
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework import status
+
+from budget.factory import BudgetFactory, ExpenseBudgetFactory, IncomeBudgetFactory
+from budget.models import BudgetTotal
+from budget.tests.test_views import BaseTestCase
+
+
+class BudgetTotalTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.salary = IncomeBudgetFactory.create(amount=100, budget=self.home_budget, category=self.work_category)
+        self.fruits = ExpenseBudgetFactory.create(amount=-30.55, budget=self.home_budget, category=self.food_category)
+        self.authorize(self.batman)
+
+    def assertTotalsMatchRecords(self):
+        self.assertEqual(BudgetTotal.objects.verify(), [])
+
+    def category_total(self, category):
+        return BudgetTotal.objects.get(budget=self.home_budget, category=category)
+
+    def test_created_records_are_counted(self):
+        self.assertTotalsMatchRecords()
+        self.assertEqual(self.category_total(self.work_category).income, Decimal("100"))
+        self.assertEqual(self.category_total(self.food_category).expense, Decimal("-30.55"))
+        self.assertEqual(self.category_total(self.food_category).records_count, 1)
+
+    def test_updated_record_moves_between_totals(self):
+        response = self.client.patch(
+            reverse("budgetrecord-detail", args=(self.fruits.id,)),
+            data=json.dumps({"amount": "12.00"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.fruits.refresh_from_db()
+        self.fruits.category = self.work_category
+        self.fruits.save()
+
+        self.assertTotalsMatchRecords()
+        self.assertEqual(self.category_total(self.work_category).income, Decimal("112"))
+        self.assertEqual(self.category_total(self.food_category).records_count, 0)
+
+    def test_deleted_record_is_subtracted(self):
+        response = self.client.delete(reverse("budgetrecord-detail", args=(self.fruits.id,)))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertTotalsMatchRecords()
+        self.assertEqual(self.category_total(self.food_category).expense, Decimal(0))
+
+    def test_bulk_created_records_are_counted(self):
+        data = [{"amount": "-1.50", "budget": self.home_budget.id, "category": self.food_category.id}] * 3
+        response = self.client.post(
+            reverse("budgetrecord-bulk-create"), data=json.dumps(data), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertTotalsMatchRecords()
+        self.assertEqual(self.category_total(self.food_category).records_count, 4)
+
+    def test_nested_records_are_counted(self):
+        data = {"name": "nested", "owners": [self.batman.id], "records": [{"amount": "5.00"}, {"amount": "-2.00"}]}
+        response = self.client.post(reverse("budget-list"), data=json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertTotalsMatchRecords()
+        total = BudgetTotal.objects.get(budget_id=response.data["id"])
+        self.assertEqual((total.income, total.expense, total.records_count), (Decimal(5), Decimal(-2), 2))
+
+    def test_budget_delete_cascades(self):
+        response = self.client.delete(reverse("budget-detail", args=(self.home_budget.id,)))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertFalse(BudgetTotal.objects.exists())
+
+    def test_rebuild_command(self):
+        BudgetTotal.objects.all().update(income=0, records_count=7)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_totals", "--verify-only")
+
+        call_command("rebuild_totals")
+        self.assertTotalsMatchRecords()
+        self.assertEqual(self.category_total(self.work_category).income, Decimal("100"))
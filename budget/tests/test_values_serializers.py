@@ -0,0 +1,76 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db.models import Q, Sum
+from django.test import override_settings
+from django.urls import reverse
+
+from budget.factory import BudgetFactory, ExpenseBudgetFactory, IncomeBudgetFactory
+from budget.models import BudgetRecord
+from budget.tests.test_views import BaseTestCase
+from budget.views import BudgetViewSet
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)
+class ValuesListTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        IncomeBudgetFactory.create_batch(3, budget=self.home_budget, category=self.work_category)
+        ExpenseBudgetFactory.create_batch(3, budget=self.home_budget, category=self.food_category)
+        BudgetRecord.objects.create(budget=self.home_budget, amount=Decimal("-0.50"), category=None)
+
+        self.shared_budget = BudgetFactory.create(name="shared", owners=[self.star_lord, self.batman])
+        ExpenseBudgetFactory.create_batch(2, budget=self.shared_budget, category=self.transport_category)
+        BudgetFactory.create(name="empty", owners=[self.batman])
+        self.authorize(self.batman)
+
+    def assertSameAsModelSerializers(self, url):
+        with override_settings(VALUES_LIST_SERIALIZERS=False):
+            expected = self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    def test_record_list(self):
+        records = reverse("budgetrecord-list")
+        response = self.assertSameAsModelSerializers(records)
+        self.assertEqual(response.data["count"], 9)
+        self.assertSameAsModelSerializers(f"{records}?limit=3&offset=2")
+        self.assertSameAsModelSerializers(f"{records}?category={self.food_category.id}")
+
+        response = self.assertSameAsModelSerializers(f"{records}?pagination=cursor&limit=4")
+        self.assertSameAsModelSerializers(response.data["next"])
+
+    def test_budget_list(self):
+        budgets = reverse("budget-list")
+        response = self.assertSameAsModelSerializers(budgets)
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertSameAsModelSerializers(f"{budgets}?category={self.transport_category.id}")
+        self.assertSameAsModelSerializers(f"{budgets}?pagination=cursor&limit=2")
+
+    def test_budget_list_with_null_totals(self):
+        def annotate_totals(queryset):
+            # without Coalesce the budget with no records gets NULL totals
+            return queryset.annotate(
+                income=Sum("records__amount", filter=Q(records__amount__gt=0)),
+                expense=Sum("records__amount", filter=Q(records__amount__lt=0)),
+            )
+
+        with mock.patch.object(BudgetViewSet, "_annotate_totals", staticmethod(annotate_totals)):
+            response = self.assertSameAsModelSerializers(reverse("budget-list"))
+        empty = next(budget for budget in response.data["results"] if budget["name"] == "empty")
+        self.assertIsNone(empty["income"])
+        self.assertIsNone(empty["expense"])
+
+    @override_settings(TIME_ZONE="Europe/Warsaw")
+    def test_datetimes_in_current_time_zone(self):
+        self.assertSameAsModelSerializers(reverse("budgetrecord-list"))
+        self.assertSameAsModelSerializers(reverse("budget-list"))
+
+    def test_record_list_reads_categories_in_the_same_query(self):
+        self.client.get(reverse("budgetrecord-list"))
+        # with the token cached: ETag version, count and the page
+        with self.assertNumQueries(3):
+            self.client.get(reverse("budgetrecord-list"))
@@ -1,14 +1,17 @@
 import json
+from datetime import datetime, timezone
 from decimal import Decimal
 
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 
 from budget.factory import BudgetFactory, CategoryFactory, ExpenseBudgetFactory, IncomeBudgetFactory
-from budget.models import Budget, BudgetCategory, BudgetRecord
+from budget.models import Budget, BudgetCategory, BudgetRecord, BudgetTotal
 
 
 class BaseTestCase(TestCase):
@@ -92,6 +95,199 @@ class BudgetListTest(BaseTestCase):
             self.assertIn(budget["id"], expected_budget_ids)
 
 
+class BudgetListRepresentationTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.salary = IncomeBudgetFactory.create(amount=100, budget=self.home_budget, category=self.work_category)
+        self.bonus = IncomeBudgetFactory.create(amount=20.5, budget=self.home_budget, category=self.work_category)
+        self.sofa = ExpenseBudgetFactory.create(
+            amount=-70.25, budget=self.home_budget, category=self.furniture_category
+        )
+        self.empty_budget = BudgetFactory.create(name="empty", owners=[self.batman])
+
+    def get_budget(self, params=None, budget=None):
+        response = self.client.get(reverse("budget-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        budget = budget or self.home_budget
+        return next(result for result in response.data["results"] if result["id"] == budget.id)
+
+    def test_list_returns_summary_without_records(self):
+        self.authorize(self.batman)
+        budget = self.get_budget()
+
+        self.assertNotIn("records", budget)
+        self.assertEqual(budget["income"], "120.50")
+        self.assertEqual(budget["expense"], "-70.25")
+
+    def test_empty_budget_totals_are_zero(self):
+        self.authorize(self.batman)
+        budget = self.get_budget(budget=self.empty_budget)
+
+        self.assertEqual(budget["income"], "0.00")
+        self.assertEqual(budget["expense"], "0.00")
+
+    def test_category_filter_does_not_narrow_totals(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budget-list"), {"category": [self.work_category.id]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["income"], "120.50")
+        self.assertEqual(response.data["results"][0]["expense"], "-70.25")
+
+    def test_records_count(self):
+        self.authorize(self.batman)
+
+        self.assertEqual(self.get_budget()["records_count"], 3)
+        self.assertEqual(self.get_budget(budget=self.empty_budget)["records_count"], 0)
+
+    def test_records_count_with_category_filter(self):
+        shared_budget = BudgetFactory.create(name="shared", owners=[self.batman, self.star_lord])
+        IncomeBudgetFactory.create_batch(3, budget=shared_budget, category=self.work_category)
+        self.authorize(self.batman)
+        response = self.client.get(
+            reverse("budget-list"), {"category": [self.work_category.id, self.furniture_category.id]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {budget["id"]: budget["records_count"] for budget in response.data["results"]}
+        self.assertEqual(counts, {self.home_budget.id: 3, shared_budget.id: 3})
+
+    def test_records_count_and_totals_in_one_query(self):
+        self.authorize(self.batman)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse("budget-detail", args=(self.home_budget.id,)))
+
+        records_queries = [query for query in context.captured_queries if "budget_budgetrecord" in query["sql"]]
+        self.assertEqual(len(records_queries), 1)
+
+    def test_expand_records(self):
+        self.authorize(self.batman)
+        budget = self.get_budget({"expand": "records"})
+
+        self.assertEqual({record["id"] for record in budget["records"]}, {self.salary.id, self.bonus.id, self.sofa.id})
+
+    def test_latest_records_preview(self):
+        self.authorize(self.batman)
+        budget = self.get_budget({"records_preview": 2})
+
+        self.assertNotIn("records", budget)
+        self.assertEqual([record["id"] for record in budget["latest_records"]], [self.sofa.id, self.bonus.id])
+
+    def test_invalid_records_preview(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budget-list"), {"records_preview": "all"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_returns_summary(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budget-detail", args=(self.home_budget.id,)))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("records", response.data)
+        self.assertEqual(response.data["income"], "120.50")
+        self.assertEqual(response.data["records_count"], 3)
+
+
+class BudgetSummaryTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        IncomeBudgetFactory.create(amount=100, budget=self.home_budget, category=self.work_category)
+        IncomeBudgetFactory.create(amount=50, budget=self.home_budget, category=self.work_category)
+        ExpenseBudgetFactory.create(amount=-30.5, budget=self.home_budget, category=self.food_category)
+        self.old_expense = ExpenseBudgetFactory.create(amount=-10, budget=self.home_budget)
+        BudgetRecord.objects.filter(id=self.old_expense.id).update(
+            created_at=datetime(2020, 1, 15, tzinfo=timezone.utc)
+        )
+
+        self.vacation_budget = BudgetFactory.create(name="vacation", owners=[self.batman, self.star_lord])
+        ExpenseBudgetFactory.create(amount=-99, budget=self.vacation_budget, category=self.transport_category)
+
+    def test_budget_summary(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budget-summary", args=(self.home_budget.id,)))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["budget"], self.home_budget.id)
+        self.assertEqual(response.data["income"], "150.00")
+        self.assertEqual(response.data["expense"], "-40.50")
+        self.assertEqual(response.data["balance"], "109.50")
+        self.assertEqual(response.data["records_count"], 4)
+        categories = {category["category"]: category for category in response.data["categories"]}
+        self.assertEqual(categories[self.work_category.id]["income"], "150.00")
+        self.assertEqual(categories[self.work_category.id]["records_count"], 2)
+        self.assertEqual(categories[self.food_category.id]["name"], "food")
+        self.assertEqual(categories[None]["expense"], "-10.00")
+
+    def test_budget_summary_date_range(self):
+        self.authorize(self.batman)
+        response = self.client.get(
+            reverse("budget-summary", args=(self.home_budget.id,)), {"date_from": "2020-01-01", "date_to": "2020-01-15"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["balance"], "-10.00")
+        self.assertEqual(response.data["records_count"], 1)
+
+    def test_invalid_date_range(self):
+        self.authorize(self.batman)
+        response = self.client.get(
+            reverse("budget-summary", args=(self.home_budget.id,)), {"date_from": "2020-02-01", "date_to": "2020-01-01"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_owner_gets_summary(self):
+        self.authorize(self.star_lord)
+        response = self.client.get(reverse("budget-summary", args=(self.home_budget.id,)))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_summaries_of_many_budgets(self):
+        self.authorize(self.batman)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("budget-summaries"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        balances = {summary["budget"]: summary["balance"] for summary in response.data}
+        self.assertEqual(balances, {self.home_budget.id: "109.50", self.vacation_budget.id: "-99.00"})
+        totals_queries = [query for query in context.captured_queries if "budget_budgettotal" in query["sql"]]
+        self.assertEqual(len(totals_queries), 1)
+        self.assertFalse([query for query in context.captured_queries if "budget_budgetrecord" in query["sql"]])
+
+    def test_whole_months_summary(self):
+        self.authorize(self.batman)
+        month = BudgetTotal.objects.month_of(self.old_expense.created_at)
+        response = self.client.get(
+            reverse("budget-summary", args=(self.home_budget.id,)), {"date_from": month, "date_to": "2100-12-31"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["balance"], "109.50")
+
+    def test_summaries_of_selected_budgets(self):
+        self.authorize(self.star_lord)
+        response = self.client.get(
+            reverse("budget-summaries"), {"budget": [self.home_budget.id, self.vacation_budget.id]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([summary["budget"] for summary in response.data], [self.vacation_budget.id])
+
+    def test_invalid_ids(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budget-summaries"), {"budget": [self.home_budget.id, "abc"]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("budget", response.data)
+
+        response = self.client.get(reverse("budget-list"), {"category": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("category", response.data)
+
+
 class BudgetCreateTest(BaseTestCase):
     def setUp(self):
         super().setUp()
@@ -174,6 +370,31 @@ class BudgetCreateTest(BaseTestCase):
         self.assertEqual(BudgetCategory.objects.filter(name="food").count(), 1)
         self.assertEqual(Budget.objects.get(name=name).records.count(), 2)
 
+    def test_reuses_existing_categories(self):
+        self.authorize(self.batman)
+        records = [{"amount": "25.05", "category": {"name": "food"}}, {"amount": "-5.00", "category": {"name": "gym"}}]
+        data = {"name": "Batman's category budget", "owners": [self.batman.id], "records": records}
+        response = self.send_create_request(data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(BudgetCategory.objects.filter(name="food").get(), self.food_category)
+        self.assertEqual(BudgetRecord.objects.filter(category__name="gym").count(), 1)
+
+    def test_queries_do_not_grow_with_records(self):
+        self.authorize(self.batman)
+
+        def records(count):
+            return [{"amount": "1.00", "category": {"name": f"category {i % 5}"}} for i in range(count)]
+
+        with CaptureQueriesContext(connection) as small_budget:
+            self.send_create_request({"name": "small", "owners": [self.batman.id], "records": records(5)})
+        with CaptureQueriesContext(connection) as large_budget:
+            self.send_create_request({"name": "large", "owners": [self.batman.id], "records": records(100)})
+
+        self.assertLessEqual(len(large_budget), len(small_budget))
+        self.assertEqual(Budget.objects.get(name="large").records.count(), 100)
+        self.assertEqual(BudgetCategory.objects.filter(name__startswith="category").count(), 5)
+
 
 class BudgetDetailTest(BaseTestCase):
     def setUp(self):
@@ -354,6 +575,166 @@ class BudgetRecordListTest(BaseTestCase):
         self.assertEqual(len(response.data["results"]), 20)
 
 
+class BudgetRecordCursorPaginationTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.records = ExpenseBudgetFactory.create_batch(45, budget=self.home_budget, category=self.food_category)
+
+    def walk(self, url, params=None):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            if not response.data["next"]:
+                return pages
+            response = self.client.get(response.data["next"])
+
+    def test_default_keeps_limit_offset_shape(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budgetrecord-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 45)
+
+    def test_cursor_mode_walks_all_records_once(self):
+        self.authorize(self.batman)
+        pages = self.walk(reverse("budgetrecord-list"), {"pagination": "cursor"})
+
+        self.assertEqual([len(page["results"]) for page in pages], [20, 20, 5])
+        self.assertNotIn("count", pages[0])
+        self.assertIsNone(pages[0]["previous"])
+        response_ids = [record["id"] for page in pages for record in page["results"]]
+        self.assertEqual(response_ids, sorted((record.id for record in self.records), reverse=True))
+
+    def test_cursor_mode_breaks_created_at_ties_by_id(self):
+        BudgetRecord.objects.update(created_at=self.records[0].created_at)
+        self.authorize(self.batman)
+        pages = self.walk(reverse("budgetrecord-list"), {"pagination": "cursor", "limit": 7})
+
+        response_ids = [record["id"] for page in pages for record in page["results"]]
+        self.assertEqual(response_ids, sorted((record.id for record in self.records), reverse=True))
+
+    def test_previous_link_returns_previous_page(self):
+        self.authorize(self.batman)
+        first_page = self.client.get(reverse("budgetrecord-list"), {"pagination": "cursor"}).data
+        second_page = self.client.get(first_page["next"]).data
+        previous_page = self.client.get(second_page["previous"]).data
+
+        self.assertEqual(previous_page["results"], first_page["results"])
+
+    def test_invalid_cursor(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budgetrecord-list"), {"cursor": "xxxx"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_budgets_cursor_mode(self):
+        BudgetFactory.create_batch(25, owners=[self.batman])
+        self.authorize(self.batman)
+        pages = self.walk(reverse("budget-list"), {"pagination": "cursor"})
+
+        self.assertEqual([len(page["results"]) for page in pages], [20, 6])
+
+
+class BudgetRecordSeriesTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.business_budget = BudgetFactory.create(name="business", owners=[self.batman])
+        self.create_record(100, datetime(2022, 3, 1, 10, tzinfo=timezone.utc), category=self.work_category)
+        self.create_record(-20, datetime(2022, 3, 3, 10, tzinfo=timezone.utc), category=self.food_category)
+        self.create_record(-5, datetime(2022, 3, 3, 18, tzinfo=timezone.utc), category=self.food_category)
+        self.create_record(-40, datetime(2022, 4, 12, 10, tzinfo=timezone.utc), category=self.transport_category)
+        self.create_record(-1, datetime(2022, 4, 12, 10, tzinfo=timezone.utc), budget=self.business_budget)
+
+    def create_record(self, amount, created_at, budget=None, category=None):
+        record = IncomeBudgetFactory.create(amount=amount, budget=budget or self.home_budget, category=category)
+        BudgetRecord.objects.filter(id=record.id).update(created_at=created_at)
+
+    def get_series(self, params):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budgetrecord-series"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_monthly_series(self):
+        data = self.get_series({"budget": self.home_budget.id})
+
+        self.assertEqual(data["bucket"], "month")
+        self.assertEqual(
+            [(point["bucket"], point["income"], point["expense"]) for point in data["results"]],
+            [("2022-03-01", "100.00", "-25.00"), ("2022-04-01", "0.00", "-40.00")],
+        )
+
+    def test_daily_series_by_category(self):
+        data = self.get_series({"bucket": "day", "category": self.food_category.id})
+
+        self.assertEqual(
+            [(point["bucket"], point["expense"], point["records_count"]) for point in data["results"]],
+            [("2022-03-03", "-25.00", 2)],
+        )
+
+    def test_weekly_series_starts_on_monday(self):
+        data = self.get_series({"bucket": "week", "budget": self.home_budget.id, "date_to": "2022-03-31"})
+
+        self.assertEqual([point["bucket"] for point in data["results"]], ["2022-02-28"])
+        self.assertEqual(data["results"][0]["balance"], "75.00")
+
+    def test_invalid_bucket(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budgetrecord-series"), {"bucket": "year"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BudgetRecordExportTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.fruits = ExpenseBudgetFactory.create(amount=-30.5, budget=self.home_budget, category=self.food_category)
+        self.salary = IncomeBudgetFactory.create(amount=1000, budget=self.home_budget, category=self.work_category)
+        self.other_budget = BudgetFactory.create(name="other", owners=[self.star_lord])
+        ExpenseBudgetFactory.create(budget=self.other_budget, category=self.food_category)
+
+    def export(self, params):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budgetrecord-export"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        lines = self.export({}).splitlines()
+
+        self.assertEqual(lines[0], "id,created_at,updated_at,amount,budget,category,category_name")
+        self.assertEqual(len(lines), 3)
+        record_id, _, _, amount, budget, category, category_name = lines[2].split(",")
+        self.assertEqual(
+            (int(record_id), amount, int(budget), int(category), category_name),
+            (self.fruits.id, "-30.50", self.home_budget.id, self.food_category.id, "food"),
+        )
+
+    def test_ndjson_export_with_filters(self):
+        rows = [
+            json.loads(line)
+            for line in self.export({"export_format": "ndjson", "category": self.work_category.id}).splitlines()
+        ]
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], self.salary.id)
+        self.assertEqual(rows[0]["amount"], "1000.00")
+        self.assertEqual(rows[0]["category_name"], "work")
+        self.assertTrue(rows[0]["created_at"].endswith("Z"))
+
+    def test_unknown_format(self):
+        self.authorize(self.batman)
+        response = self.client.get(reverse("budgetrecord-export"), {"export_format": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class BudgetRecordDetailTest(BaseTestCase):
     def setUp(self):
         super().setUp()
@@ -401,6 +782,77 @@ class BudgetRecordCreateTest(BaseTestCase):
         self.assertEqual(created_record.budget, self.home_budget)
 
 
+class BudgetRecordBulkCreateTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home_budget = BudgetFactory.create(name="home", owners=[self.batman])
+        self.business_budget = BudgetFactory.create(name="business", owners=[self.star_lord])
+
+    def send_bulk_request(self, data, params=""):
+        return self.client.post(
+            reverse("budgetrecord-bulk-create") + params, data=json.dumps(data), content_type="application/json"
+        )
+
+    def test_can_create_records(self):
+        self.authorize(self.batman)
+        data = [
+            {"amount": "-15.22", "budget": self.home_budget.id, "category": self.food_category.id},
+            {"amount": "1200.00", "budget": self.home_budget.id, "category": self.work_category.id},
+            {"amount": "-3.10", "budget": self.home_budget.id},
+        ]
+        response = self.send_bulk_request(data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 3)
+        self.assertEqual(response.data["errors"], [])
+        self.assertEqual(self.home_budget.records.count(), 3)
+        self.assertEqual(self.home_budget.records.filter(category=self.food_category).count(), 1)
+
+    def test_nothing_created_when_any_item_is_invalid(self):
+        self.authorize(self.batman)
+        data = [
+            {"amount": "-15.22", "budget": self.home_budget.id},
+            {"amount": "xxxx", "budget": self.home_budget.id},
+            {"amount": "-15.22", "budget": self.business_budget.id},
+            {"amount": "-15.22", "budget": self.home_budget.id, "category": 0},
+        ]
+        response = self.send_bulk_request(data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2, 3])
+        self.assertIn("amount", response.data["errors"][0]["errors"])
+        self.assertIn("budget", response.data["errors"][1]["errors"])
+        self.assertIn("category", response.data["errors"][2]["errors"])
+        self.assertEqual(BudgetRecord.objects.count(), 0)
+
+    def test_partial_success(self):
+        self.authorize(self.batman)
+        data = [{"amount": "-15.22", "budget": self.home_budget.id}, {"amount": "-15.22"}]
+        response = self.send_bulk_request(data, "?partial=true")
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(len(response.data["created"]), 1)
+        self.assertEqual(response.data["errors"][0]["index"], 1)
+        self.assertEqual(self.home_budget.records.count(), 1)
+
+    def test_requires_list(self):
+        self.authorize(self.batman)
+        response = self.send_bulk_request({"amount": "-15.22", "budget": self.home_budget.id})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        self.authorize(self.batman)
+        item = {"amount": "-15.22", "budget": self.home_budget.id, "category": self.food_category.id}
+        with CaptureQueriesContext(connection) as small_batch:
+            self.send_bulk_request([item] * 2)
+        with CaptureQueriesContext(connection) as large_batch:
+            self.send_bulk_request([item] * 50)
+
+        self.assertLessEqual(len(large_batch), len(small_batch))
+        self.assertEqual(self.home_budget.records.count(), 52)
+
+
 class BudgetRecordUpdateTest(BaseTestCase):
     def setUp(self):
         super().setUp()
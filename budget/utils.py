@@ -1,3 +1,9 @@
+from django.conf import settings
+from rest_framework.response import Response
+
+from budget.middleware import serializer_timer
+
+
 class MultiSerializerViewSetMixin(object):
     def get_serializer_class(self):
         """
@@ -24,3 +30,34 @@ class MultiSerializerViewSetMixin(object):
             return self.serializer_action_classes[self.action]
         except (KeyError, AttributeError):
             return super(MultiSerializerViewSetMixin, self).get_serializer_class()
+
+
+class TimedSerializerMixin:
+    """Count the time spent in ``to_representation`` as serializer time of the instrumentation middleware."""
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class ValuesListMixin:
+    """
+    ``list`` through ``values_serializer_class`` (see ``budget.serializers.ValuesSerializer``)
+    while ``VALUES_LIST_SERIALIZERS`` is on and ``get_values_serializer_class`` returns one.
+    """
+
+    values_serializer_class = None
+
+    def get_values_serializer_class(self):
+        return self.values_serializer_class if settings.VALUES_LIST_SERIALIZERS else None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_values_serializer_class()
+        if serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = serializer_class.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page).data)
+        return Response(serializer_class(queryset).data)
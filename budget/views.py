@@ -1,11 +1,51 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Count, Q
-from rest_framework import generics, viewsets
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.pagination import _positive_int
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+from budget.caching import ConditionalGetMixin
+from budget.exports import EXPORT_CONTENT_TYPES, EXPORT_STREAMS, export_rows
+from budget.models import Budget, BudgetCategory, BudgetRecord, BudgetTotal, SyncEvent
+from budget.pagination import SyncRecordPagination
+from budget.reports import budget_summaries, date_range_filter, spending_series
+from budget.routers import ReplicaReadMixin
+from budget.serializers import (
+    RECORD_ORDERINGS,
+    BudgetQuerySerializer,
+    BudgetRecordBulkSerializer,
+    BudgetRecordCreateSerializer,
+    BudgetRecordSerializer,
+    BudgetRecordValuesSerializer,
+    BudgetSerializer,
+    BudgetSummarySerializer,
+    BudgetValuesSerializer,
+    BudgetWithLatestRecordsSerializer,
+    BudgetWithRecordsSerializer,
+    RecordQuerySerializer,
+    SeriesPointSerializer,
+    SeriesQuerySerializer,
+    SyncQuerySerializer,
+    SyncSerializer,
+    UserSerializer,
+)
+from budget.utils import MultiSerializerViewSetMixin, ValuesListMixin
 
-from budget.models import Budget, BudgetRecord
-from budget.serializers import BudgetRecordCreateSerializer, BudgetRecordSerializer, BudgetSerializer, UserSerializer
-from budget.utils import MultiSerializerViewSetMixin
+TOTAL_FIELD = DecimalField(max_digits=14, decimal_places=2)
 
 
 class UserCreate(generics.CreateAPIView):
@@ -14,47 +54,341 @@ class UserCreate(generics.CreateAPIView):
     permission_classes = (AllowAny,)
 
 
+class AccessibleBudgetsMixin:
+    @cached_property
+    def budget_ids(self):
+        """
+        Budgets of the user; querysets filter on them instead of joining the owners table.
+        Detail lookups and writes go to the owners table, the cached ids of another
+        process may still hold a budget the user was removed from.
+        """
+        cached = self.request.method in SAFE_METHODS and not self.detail
+        return Budget.objects.accessible_ids(self.request.user, cached=cached)
+
+
 class RowCountMixin:
     @staticmethod
-    def _annotate_items_count(queryset, field):
-        return queryset.annotate(items_count=Count(field))
+    def _annotate_items_count(queryset, field, name="items_count"):
+        return queryset.annotate(**{name: Count(field)})
 
 
-class BudgetRecordViewSet(MultiSerializerViewSetMixin, viewsets.ModelViewSet):
-    queryset = BudgetRecord.objects.all().select_related("budget").prefetch_related("category")
+class BudgetRecordViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    AccessibleBudgetsMixin,
+    ValuesListMixin,
+    MultiSerializerViewSetMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = (
+        BudgetRecord.objects.all().select_related("budget").prefetch_related("category").order_by("-created_at", "-id")
+    )
     serializer_class = BudgetRecordSerializer
+    values_serializer_class = BudgetRecordValuesSerializer
     serializer_action_classes = {
         "create": BudgetRecordCreateSerializer,
+        "bulk_create": BudgetRecordBulkSerializer,
     }
     permission_classes = (IsAuthenticated,)
+    max_bulk_size = 5000
+    filter_actions = ("list", "series", "export")
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = super().get_queryset().filter(budget__owners__in=(user,))
-        filters = Q()
-        budget = self.request.query_params.get("budget")
-        categories = self.request.query_params.getlist("category")
-        if categories:
-            filters |= Q(**{"category__in": [int(category) for category in categories]})
-        if budget:
-            filters |= Q(**{"budget": budget})
-        return queryset.filter(filters)
-
-
-class BudgetViewSet(viewsets.ModelViewSet):
-    queryset = Budget.objects.all().prefetch_related("records__category", "owners")
+        queryset = super().get_queryset().filter(budget_id__in=self.budget_ids)
+        if self.action in self.filter_actions:
+            queryset = queryset.filter(self._record_filters(self.record_query)).order_by(*self.keyset_ordering)
+        return queryset
+
+    @cached_property
+    def record_query(self):
+        params = RecordQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    @property
+    def keyset_ordering(self):
+        return RECORD_ORDERINGS[self.record_query["ordering"]]
+
+    @staticmethod
+    def _record_filters(query):
+        # a plain created_at range, so PostgreSQL only scans the partitions of those months
+        filters = date_range_filter(query.get("date_from"), query.get("date_to"))
+        if "budget" in query:
+            filters &= Q(budget_id=query["budget"])
+        if query.get("category"):
+            filters &= Q(category_id__in=query["category"])
+        if query.get("type") == "income":
+            filters &= Q(amount__gt=0)
+        elif query.get("type") == "expense":
+            filters &= Q(amount__lt=0)
+        if "amount_min" in query:
+            filters &= Q(amount__gte=query["amount_min"])
+        if "amount_max" in query:
+            filters &= Q(amount__lte=query["amount_max"])
+        return filters
+
+    @action(detail=False, methods=["get"])
+    def series(self, request):
+        params = SeriesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        bucket = params.validated_data["bucket"]
+        records = self.filter_queryset(self.get_queryset())
+        return Response(
+            {
+                "bucket": bucket,
+                "results": SeriesPointSerializer(spending_series(records, bucket), many=True).data,
+            }
+        )
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_STREAMS:
+            raise ValidationError({"export_format": f"Choose one of: {', '.join(EXPORT_STREAMS)}."})
+        # the stream is read after the view returned, outside of the request's read database
+        rows = export_rows(self.filter_queryset(self.get_queryset()).using(self.read_db))
+        response = StreamingHttpResponse(
+            EXPORT_STREAMS[export_format](rows), content_type=EXPORT_CONTENT_TYPES[export_format]
+        )
+        response["Content-Disposition"] = f'attachment; filename="records.{export_format}"'
+        return response
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of records."]})
+        if len(items) > self.max_bulk_size:
+            raise ValidationError({"non_field_errors": [f"At most {self.max_bulk_size} records per request."]})
+
+        context = {
+            **self.get_serializer_context(),
+            "budgets": Budget.objects.filter(id__in=self.budget_ids).in_bulk(self._item_ids(items, "budget")),
+            "categories": BudgetCategory.objects.in_bulk(self._item_ids(items, "category")),
+        }
+        records, errors = [], []
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item, context=context)
+            if serializer.is_valid():
+                records.append(BudgetRecord(**serializer.validated_data))
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+
+        partial = request.query_params.get("partial") in ("1", "true")
+        if errors and not partial:
+            return Response({"created": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            BudgetRecord.objects.bulk_create(records, batch_size=500)
+            BudgetTotal.objects.add_records(records)
+
+        return Response(
+            {"created": BudgetRecordSerializer(records, many=True).data, "errors": errors},
+            status=status.HTTP_207_MULTI_STATUS if errors else status.HTTP_201_CREATED,
+        )
+
+    @staticmethod
+    def _item_ids(items, field):
+        ids = set()
+        for item in items:
+            try:
+                ids.add(int(item[field]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        return ids
+
+
+class BudgetViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    AccessibleBudgetsMixin,
+    ValuesListMixin,
+    RowCountMixin,
+    viewsets.ModelViewSet,
+):
+    # owners ordered by id, as BudgetValuesSerializer lists them
+    queryset = (
+        Budget.objects.all()
+        .prefetch_related(Prefetch("owners", queryset=User.objects.order_by("id")))
+        .order_by("-created_at", "-id")
+    )
     serializer_class = BudgetSerializer
+    values_serializer_class = BudgetValuesSerializer
     permission_classes = (IsAuthenticated,)
+    max_records_preview = 50
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = super().get_queryset().filter(owners__in=(user,))
-        filters = Q()
-        categories = self.request.query_params.getlist("category")
-        if categories:
-            filters |= Q(**{"records__category__in": [int(category) for category in categories]})
-        return queryset.filter(filters).distinct()
+        queryset = super().get_queryset().filter(id__in=self.budget_ids)
+        if self.action in ("summary", "summaries"):
+            return queryset
+        if categories := self.budget_query.get("category"):
+            # EXISTS instead of a join on records, so the filter neither duplicates budgets
+            # nor narrows the records the totals are computed from
+            records = BudgetRecord.objects.filter(budget=OuterRef("pk"), category__in=categories)
+            queryset = queryset.filter(Exists(records))
+        # count and totals share one LEFT JOIN on records and a single GROUP BY
+        queryset = self._annotate_totals(self._annotate_records_count(queryset))
+        if self.action in ("list", "retrieve"):
+            queryset = self._prefetch_records(queryset)
+        return queryset
+
+    @action(detail=True, methods=["get"])
+    def summary(self, request, pk=None):
+        budget = self.get_object()
+        return Response(self._summaries([budget.id])[0])
+
+    @action(detail=False, methods=["get"], url_path="summary")
+    def summaries(self, request):
+        budget_ids = list(self.get_summaries_queryset().values_list("id", flat=True))
+        return Response(self._summaries(budget_ids))
+
+    def get_summaries_queryset(self):
+        queryset = self.get_queryset()
+        if budgets := self.budget_query.get("budget"):
+            queryset = queryset.filter(id__in=budgets)
+        return queryset
+
+    @cached_property
+    def budget_query(self):
+        params = BudgetQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    def get_date_range(self):
+        return {key: value for key, value in self.budget_query.items() if key in ("date_from", "date_to")}
+
+    def _summaries(self, budget_ids):
+        summaries = budget_summaries(budget_ids, **self.get_date_range())
+        return BudgetSummarySerializer(summaries, many=True).data
+
+    def get_values_serializer_class(self):
+        if self._expand_records() or self._records_preview():
+            return None
+        return super().get_values_serializer_class()
+
+    def get_serializer_class(self):
+        if self.action in ("list", "retrieve"):
+            if self._expand_records():
+                return BudgetWithRecordsSerializer
+            if self._records_preview():
+                return BudgetWithLatestRecordsSerializer
+        return super().get_serializer_class()
+
+    def _expand_records(self):
+        return "records" in self.request.query_params.getlist("expand")
+
+    def _records_preview(self):
+        preview = self.request.query_params.get("records_preview")
+        if not preview:
+            return 0
+        try:
+            return _positive_int(preview, strict=True, cutoff=self.max_records_preview)
+        except ValueError:
+            raise ValidationError({"records_preview": "A positive integer is required."})
+
+    def _prefetch_records(self, queryset):
+        if self._expand_records():
+            return queryset.prefetch_related("records__category")
+        if preview := self._records_preview():
+            latest_ids = (
+                BudgetRecord.objects.filter(budget=OuterRef("budget"))
+                .order_by("-created_at", "-id")
+                .values("id")[:preview]
+            )
+            latest_records = (
+                BudgetRecord.objects.filter(id__in=Subquery(latest_ids))
+                .select_related("category")
+                .order_by("-created_at", "-id")
+            )
+            return queryset.prefetch_related(Prefetch("records", queryset=latest_records, to_attr="latest_records"))
+        return queryset
 
     @staticmethod
-    def _annotate_records_count(queryset):
-        return queryset.annotate(records_count=Count("records"))
+    def _annotate_totals(queryset):
+        return queryset.annotate(
+            income=Coalesce(
+                Sum("records__amount", filter=Q(records__amount__gt=0)), Decimal(0), output_field=TOTAL_FIELD
+            ),
+            expense=Coalesce(
+                Sum("records__amount", filter=Q(records__amount__lt=0)), Decimal(0), output_field=TOTAL_FIELD
+            ),
+        )
+
+    def _annotate_records_count(self, queryset):
+        return self._annotate_items_count(queryset, "records", name="records_count")
+
+
+class ResyncNeeded(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "since is older than the sync log, sync again without it."
+    default_code = "resync_needed"
+
+
+class SyncView(APIView):
+    """
+    Budgets, records and categories changed since ``?since=`` plus the ids deleted or
+    no longer shared with the user, read from the ``SyncEvent`` log. Without ``since``
+    everything is returned. ``watermark`` is the ``since`` of the next call; it lags
+    behind the clock by ``SYNC_SAFETY_LAG`` seconds so rows written by transactions
+    still running now are sent again next time instead of being skipped.
+
+    Records come in pages of ``SyncRecordPagination``; the first page also holds the
+    budgets and deleted ids, the ``next`` links carry its watermark along. A ``since``
+    older than the log's retention gets 410, the client has to sync everything again.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    pagination_class = SyncRecordPagination
+
+    def get(self, request):
+        params = SyncQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        since = params.validated_data.get("since")
+        if since and since < SyncEvent.objects.retained_since():
+            raise ResyncNeeded()
+        watermark = params.validated_data.get("watermark")
+        if watermark is None:
+            watermark = timezone.now() - timedelta(seconds=settings.SYNC_SAFETY_LAG)
+        paginator = self.pagination_class()
+        first_page = paginator.cursor_query_param not in request.query_params
+
+        user = request.user
+        budgets = Budget.objects.filter(owners=user).prefetch_related("owners").order_by("id")
+        records = BudgetRecord.objects.filter(budget__owners=user)
+        deleted = {"budgets": [], "records": []}
+        if since:
+            events = SyncEvent.objects.filter(user=user, created_at__gte=since)
+            shared = events.filter(action=SyncEvent.SHARED, model="budget").values("object_id")
+            budgets = budgets.filter(Q(updated_at__gte=since) | Q(id__in=shared))
+            records = records.filter(Q(updated_at__gte=since) | Q(budget_id__in=shared))
+            watermark = max(watermark, since)
+        budgets = list(budgets) if first_page else []
+        records = paginator.paginate_queryset(records, request, view=self)
+
+        categories = BudgetCategory.objects.filter(id__in={record.category_id for record in records})
+        if since and first_page:
+            used = BudgetRecord.objects.filter(category=OuterRef("pk"), budget__owners=user)
+            categories = categories | BudgetCategory.objects.filter(Exists(used), updated_at__gte=since)
+            for model, ids, returned in (
+                ("budget", deleted["budgets"], budgets),
+                ("record", deleted["records"], records),
+            ):
+                # shared again or moved back since, the returned rows win; rows of later pages are upserted
+                # after these deletes anyway
+                returned_ids = {row.id for row in returned}
+                removed = events.filter(action=SyncEvent.DELETED, model=model).values_list("object_id", flat=True)
+                ids.extend(sorted(set(removed) - returned_ids))
+
+        next_link = paginator.get_next_link()
+        if next_link:
+            next_link = replace_query_param(next_link, "watermark", watermark.isoformat())
+        data = {
+            "since": since,
+            "watermark": watermark,
+            "next": next_link,
+            "budgets": budgets,
+            "records": records,
+            "categories": categories.order_by("id"),
+            "deleted": deleted,
+        }
+        return Response(SyncSerializer(data).data)